@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+# Throughput benchmark for tarty's compression step.
+#
+# Compares compress_content() in tarty.py against the original regex-chain
+# implementation (kept below as legacy_compress_content) on generated sources, or on
+# the files of a real source tree with --corpus.
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import tarty
+
+def legacy_remove_comments(content: str, file_extension: str) -> str:
+    if file_extension in ['.c', '.cpp', '.h', '.hh', '.hpp', '.m', '.mm', '.swift', '.js', '.ts', '.kt']:
+        content = re.sub(r'/\*[\s\S]*?\*/', '', content)
+        content = re.sub(r'//.*', '', content)
+    elif file_extension in ['.py', '.sh', '.rb']:
+        content = re.sub(r'#.*', '', content)
+    elif file_extension == '.rs':
+        content = re.sub(r'/\*[\s\S]*?\*/', '', content)
+        content = re.sub(r'//.*', '', content)
+    elif file_extension in ['.xml', '.xib', '.storyboard']:
+        content = re.sub(r'<!--[\s\S]*?-->', '', content)
+    elif file_extension == '.md':
+        content = re.sub(r'<!--[\s\S]*?-->', '', content)
+    return content
+
+def legacy_compress_content(content: str, file_extension: str) -> str:
+    content = legacy_remove_comments(content, file_extension)
+
+    if file_extension not in tarty.MARKUP_EXTENSIONS and file_extension != '.md':
+        lines = content.splitlines()
+        processed_lines = [line.strip() for line in lines if line.strip()]
+        content = '\n'.join(processed_lines)
+    elif file_extension in tarty.MARKUP_EXTENSIONS:
+        content = re.sub(r'>\s+<', '><', content)
+        lines = content.splitlines()
+        processed_lines = [line.strip() for line in lines if line.strip()]
+        content = '\n'.join(processed_lines)
+    else:  # Markdown files
+        lines = content.splitlines()
+        processed_lines = [line.strip() for line in lines]
+        content = '\n'.join(processed_lines)
+
+    return content
+
+def generate_c_like(rng: random.Random, lines: int, comment_density: float) -> str:
+    out = []
+    indent = 0
+    for i in range(lines):
+        roll = rng.random()
+        pad = '    ' * indent
+        if roll < comment_density / 2:
+            out.append(f"{pad}// note {i}: keep the counter in sync")
+        elif roll < comment_density:
+            out.append(f"{pad}/* block {i}\n{pad} * spans lines\n{pad} */")
+        elif roll < comment_density + 0.05:
+            out.append('')
+        elif roll < comment_density + 0.15 and indent < 4:
+            out.append(f"{pad}if (value_{i} > {i}) {{")
+            indent += 1
+        elif roll < comment_density + 0.25 and indent > 0:
+            indent -= 1
+            out.append('    ' * indent + '}')
+        else:
+            trailing = ' // trailing' if rng.random() < comment_density else ''
+            out.append(f"{pad}result = compute(value_{i}, \"label {i}\");{trailing}")
+    out.extend('    ' * level + '}' for level in range(indent - 1, -1, -1))
+    return '\n'.join(out) + '\n'
+
+def generate_hash_commented(rng: random.Random, lines: int, comment_density: float) -> str:
+    out = []
+    for i in range(lines):
+        roll = rng.random()
+        if roll < comment_density:
+            out.append(f"    # explain step {i}")
+        elif roll < comment_density + 0.05:
+            out.append('')
+        else:
+            trailing = '  # why' if rng.random() < comment_density else ''
+            out.append(f"    value_{i} = transform(items[{i % 7}], 'key{i}'){trailing}")
+    return '\n'.join(out) + '\n'
+
+def generate_markup(rng: random.Random, lines: int, comment_density: float) -> str:
+    out = ['<root>']
+    for i in range(lines):
+        if rng.random() < comment_density:
+            out.append(f"    <!-- element {i} -->")
+        else:
+            out.append(f"    <item id=\"{i}\">\n        <name>Item {i}</name>\n    </item>")
+    out.append('</root>')
+    return '\n'.join(out) + '\n'
+
+def generate_markdown(rng: random.Random, lines: int, comment_density: float) -> str:
+    out = []
+    for i in range(lines):
+        if rng.random() < comment_density:
+            out.append(f"<!-- todo {i} -->")
+        elif i % 10 == 0:
+            out.append(f"## Section {i}\n")
+        else:
+            out.append(f"  Paragraph {i} with some *emphasis* and `code`.  ")
+    return '\n'.join(out) + '\n'
+
+SAMPLES = [
+    ('.c', generate_c_like),
+    ('.swift', generate_c_like),
+    ('.js', generate_c_like),
+    ('.py', generate_hash_commented),
+    ('.xml', generate_markup),
+    ('.md', generate_markdown),
+]
+
+def load_corpus(corpus_dir: str):
+    # Files are kept apart and compressed one at a time, as tarty does
+    contents = {}
+    for root, dirnames, filenames in os.walk(corpus_dir):
+        dirnames[:] = [dirname for dirname in dirnames if dirname != '.git']
+        for filename in filenames:
+            file_extension = os.path.splitext(filename)[1].lower()
+            if file_extension not in tarty.ALL_EXTENSIONS:
+                continue
+            try:
+                with open(os.path.join(root, filename), 'r', encoding='utf-8') as f:
+                    contents.setdefault(file_extension, []).append(f.read())
+            except (OSError, UnicodeDecodeError):
+                continue
+    return sorted(contents.items())
+
+def best_time(func, contents, file_extension: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            func(content, file_extension)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tarty compress_content against the legacy regex chain.")
+    parser.add_argument("--lines", type=int, default=50000, help="Lines of generated source per language (default: 50000)")
+    parser.add_argument("--comment-density", type=float, default=0.2, help="Fraction of lines that are comments (default: 0.2)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best is reported (default: 5)")
+    parser.add_argument("--corpus", help="Benchmark the files of this directory, grouped by extension, instead of generated sources")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the generated sources (default: 1)")
+    args = parser.parse_args()
+
+    if args.corpus:
+        samples = load_corpus(args.corpus)
+    else:
+        rng = random.Random(args.seed)
+        samples = [(file_extension, [generate(rng, args.lines, args.comment_density)]) for file_extension, generate in SAMPLES]
+
+    print(f"{'ext':<8}{'MB':>8}{'legacy MB/s':>14}{'tarty MB/s':>14}{'speedup':>10}{'same output':>13}")
+    for file_extension, contents in samples:
+        megabytes = sum(len(content.encode('utf-8')) for content in contents) / (1024 * 1024)
+        legacy = best_time(legacy_compress_content, contents, file_extension, args.repeat)
+        current = best_time(tarty.compress_content, contents, file_extension, args.repeat)
+        same = all(legacy_compress_content(content, file_extension) == tarty.compress_content(content, file_extension)
+                   for content in contents)
+        print(f"{file_extension:<8}{megabytes:>8.2f}{megabytes / legacy:>14.1f}{megabytes / current:>14.1f}"
+              f"{legacy / current:>9.2f}x{'yes' if same else 'no':>13}")
+
+if __name__ == "__main__":
+    main()
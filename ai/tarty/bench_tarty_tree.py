@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+# Stage-by-stage benchmark of tarty over a synthetic source tree.
+#
+# Builds a reproducible tree of configurable shape, times each stage of tarty on it
+# separately and writes the results as JSON, so runs can be compared over time.
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import tarty
+import bench_tarty
+from pathspec import PathSpec
+
+GENERATORS = {
+    '.c': bench_tarty.generate_c_like,
+    '.h': bench_tarty.generate_c_like,
+    '.cpp': bench_tarty.generate_c_like,
+    '.js': bench_tarty.generate_c_like,
+    '.ts': bench_tarty.generate_c_like,
+    '.swift': bench_tarty.generate_c_like,
+    '.kt': bench_tarty.generate_c_like,
+    '.rs': bench_tarty.generate_c_like,
+    '.m': bench_tarty.generate_c_like,
+    '.py': bench_tarty.generate_hash_commented,
+    '.rb': bench_tarty.generate_hash_commented,
+    '.sh': bench_tarty.generate_hash_commented,
+    '.xml': bench_tarty.generate_markup,
+    '.md': bench_tarty.generate_markdown,
+}
+IGNORED_DIRS = ['node_modules', 'build']
+
+def parse_language_mix(text: str):
+    mix = []
+    for item in filter(None, text.split(',')):
+        extension, _, weight = item.partition('=')
+        extension = extension.strip().lower()
+        extension = extension if extension.startswith('.') else '.' + extension
+        if extension not in GENERATORS:
+            raise ValueError(f"no generator for {extension}; choose from {', '.join(sorted(GENERATORS))}")
+        mix.append((extension, float(weight or 1)))
+    return mix
+
+def build_tree(root: str, args, mix) -> None:
+    rng = random.Random(args.seed)
+    extensions = [extension for extension, _ in mix]
+    weights = [weight for _, weight in mix]
+    with open(os.path.join(root, '.gitignore'), 'w') as f:
+        f.write(''.join(f"{dirname}/\n" for dirname in IGNORED_DIRS))
+
+    for index in range(args.files):
+        parts = [f"dir{rng.randrange(args.fanout)}" for _ in range(rng.randint(0, args.depth))]
+        if rng.random() < args.ignored_ratio:
+            parts.insert(rng.randint(0, len(parts)), rng.choice(IGNORED_DIRS))
+        directory = os.path.join(root, *parts)
+        os.makedirs(directory, exist_ok=True)
+
+        extension = rng.choices(extensions, weights)[0]
+        path = os.path.join(directory, f"file{index}{extension}")
+        if rng.random() < args.binary_ratio:
+            with open(path, 'wb') as f:
+                f.write(b'\0' + rng.randbytes(args.lines * 40))
+        else:
+            content = GENERATORS[extension](rng, args.lines, args.comment_density)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+def best_time(func, repeat: int):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def stage_result(seconds: float, files: int, nbytes: int):
+    return {
+        'seconds': round(seconds, 6),
+        'files': files,
+        'bytes': nbytes,
+        'files_per_s': round(files / seconds, 1) if seconds else None,
+        'mb_per_s': round(nbytes / (1024 * 1024) / seconds, 2) if seconds else None,
+    }
+
+def peak_rss_kb() -> int:
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+class RecordingIgnoreTree(tarty.IgnoreTree):
+    # Keeps the arguments of every is_ignored() call, so the matching can be timed without the walk
+    def __init__(self, root_dir: str, custom_ignore_spec: PathSpec):
+        super().__init__(root_dir, custom_ignore_spec)
+        self.checks = []
+
+    def is_ignored(self, relative_path, rules, is_dir):
+        self.checks.append((relative_path, rules, is_dir))
+        return super().is_ignored(relative_path, rules, is_dir)
+
+def run_stages(root: str, repeat: int, jobs: int):
+    stages = {}
+    ignore_tree = tarty.IgnoreTree(root, PathSpec([]))
+
+    seconds, all_files = best_time(lambda: [os.path.join(dirpath, name) for dirpath, _, names in os.walk(root) for name in names], repeat)
+    stages['walk'] = stage_result(seconds, len(all_files), 0)
+
+    # Only the matching of each walked file and directory is timed here, the walk is timed above
+    recorder = RecordingIgnoreTree(root, PathSpec([]))
+    walked = list(tarty.walk_directory(root, recorder))
+    kept = [file_path for file_path, _, ignored in walked if not ignored]
+    checks = recorder.checks
+    seconds, _ = best_time(lambda: [ignore_tree.is_ignored(*check) for check in checks], repeat)
+    stages['ignore'] = stage_result(seconds, len(checks), 0)
+
+    sizes = {file_path: os.path.getsize(file_path) for file_path in kept}
+    seconds, binary = best_time(lambda: {file_path for file_path in kept if tarty.is_binary(file_path)}, repeat)
+    stages['is_binary'] = stage_result(seconds, len(kept), 1024 * len(kept))
+
+    sources = []
+    for file_path in kept:
+        file_extension = os.path.splitext(file_path)[1].lower()
+        if file_path not in binary and file_extension in tarty.ALL_EXTENSIONS:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                sources.append((os.path.relpath(file_path, root), f.read(), file_extension))
+    source_bytes = sum(sizes[os.path.join(root, relative_path)] for relative_path, _, _ in sources)
+
+    seconds, _ = best_time(lambda: [tarty.remove_comments(content, file_extension) for _, content, file_extension in sources], repeat)
+    stages['remove_comments'] = stage_result(seconds, len(sources), source_bytes)
+
+    seconds, compressed = best_time(lambda: [(relative_path, tarty.compress_content(content, file_extension).encode('utf-8'))
+                                             for relative_path, content, file_extension in sources], repeat)
+    stages['compress_content'] = stage_result(seconds, len(sources), source_bytes)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_file = os.path.join(output_dir, 'archive.txt')
+        seconds, archive_bytes = best_time(lambda: tarty.create_custom_archive(iter(compressed), output_file), repeat)
+        stages['create_custom_archive'] = stage_result(seconds, len(compressed), archive_bytes)
+
+        def end_to_end():
+            entries = tarty.process_directory(tarty.walk_directory(root, tarty.IgnoreTree(root, PathSpec([]))), True, jobs)
+            return tarty.create_custom_archive(entries, output_file)
+        seconds, _ = best_time(end_to_end, repeat)
+        stages['end_to_end'] = stage_result(seconds, len(kept), sum(sizes.values()))
+
+    return stages
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each tarty stage on a synthetic source tree and report JSON.")
+    parser.add_argument("--files", type=int, default=2000, help="Number of files in the tree (default: %(default)s)")
+    parser.add_argument("--depth", type=int, default=4, help="Maximum directory depth (default: %(default)s)")
+    parser.add_argument("--fanout", type=int, default=6, help="Directories per level (default: %(default)s)")
+    parser.add_argument("--lines", type=int, default=200, help="Lines per source file (default: %(default)s)")
+    parser.add_argument("--languages", default="py=3,c=2,js=2,swift=1,xml=1,md=1",
+                        help="Comma-separated extension=weight language mix (default: %(default)s)")
+    parser.add_argument("--comment-density", type=float, default=0.2, help="Fraction of comment lines (default: %(default)s)")
+    parser.add_argument("--binary-ratio", type=float, default=0.05, help="Fraction of binary files (default: %(default)s)")
+    parser.add_argument("--ignored-ratio", type=float, default=0.3,
+                        help="Fraction of files placed under gitignored directories (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the tree (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the best is reported (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for the end-to-end stage (default: %(default)s)")
+    parser.add_argument("--tree-dir", help="Build the tree here and keep it, instead of in a temporary directory")
+    parser.add_argument("-o", "--output", help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_language_mix(args.languages)
+    except ValueError as e:
+        parser.error(f"invalid --languages: {e}")
+
+    if args.tree_dir and os.path.exists(args.tree_dir) and os.listdir(args.tree_dir):
+        parser.error(f"--tree-dir {args.tree_dir} is not empty")
+
+    root = args.tree_dir or tempfile.mkdtemp(prefix='tarty-bench-')
+    try:
+        os.makedirs(root, exist_ok=True)
+        build_tree(root, args, mix)
+        stages = run_stages(root, args.repeat, args.jobs)
+    finally:
+        if not args.tree_dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'tarty_rules': tarty.compression_rules_fingerprint()[:12],
+        'config': {name: value for name, value in vars(args).items() if name not in ('output', 'tree_dir')},
+        'stages': stages,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+    for name, stage in stages.items():
+        sys.stderr.write(f"{name:<22}{stage['seconds'] * 1000:>10.1f} ms{stage['files_per_s'] or 0:>12.0f} files/s"
+                         f"{stage['mb_per_s'] or 0:>10.1f} MB/s\n")
+    sys.stderr.write(f"{'peak RSS':<22}{results['peak_rss_kb'] / 1024:>10.1f} MB\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,27 @@
 
 import os
 import re
+import atexit
+import select
+import struct
+import shutil
+import tempfile
 import argparse
+import ctypes
+import ctypes.util
+import gzip
+import hashlib
+import json
+import mmap
+import sqlite3
+import subprocess
 import sys
-from typing import List, Tuple
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Set, TextIO, Tuple
 from pathspec import PathSpec
 from pathspec.patterns import GitWildMatchPattern
 
@@ -15,19 +33,299 @@ MARKUP_EXTENSIONS = ['.json', '.xml', '.xib', '.storyboard', '.toml']
 
 ALL_EXTENSIONS = TEXT_EXTENSIONS + CODE_EXTENSIONS + MARKUP_EXTENSIONS
 
-def load_gitignore(directory: str) -> PathSpec:
-    gitignore_path = os.path.join(directory, '.gitignore')
-    if os.path.exists(gitignore_path):
-        with open(gitignore_path, 'r') as gitignore_file:
-            gitignore_content = gitignore_file.read()
-        return PathSpec.from_lines(GitWildMatchPattern, gitignore_content.splitlines())
-    return PathSpec([])
+# Literal and comment syntax per language, used to strip comments without touching literals
+DOUBLE_QUOTED = r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"'
+SINGLE_QUOTED = r"'[^'\\\n]*(?:\\.[^'\\\n]*)*'"
+TRIPLE_DOUBLE_QUOTED = r'"""[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*"""'
+TRIPLE_SINGLE_QUOTED = r"'''[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*'''"
+BACKTICK_QUOTED = r'`[^`\\]*(?:\\[\s\S][^`\\]*)*`'
+MULTILINE_DOUBLE_QUOTED = r'"[^"\\]*(?:\\[\s\S][^"\\]*)*"'
+RUST_CHAR = r"'(?:\\.[^'\n]*|[^'\\\n])'"
+SHELL_SINGLE_QUOTED = r"'[^']*'"
+TOML_LITERAL = r"'[^'\n]*'"
 
-def should_ignore_file(file_path: str, gitignore_spec: PathSpec, custom_ignore_spec: PathSpec) -> bool:
-    file_name = os.path.basename(file_path)
-    return (file_name.startswith('.') or 
-            gitignore_spec.match_file(file_path) or 
-            custom_ignore_spec.match_file(file_path))
+# Comments are written so they can only ever end at their first terminator; a lazy
+# [\s\S]*? would let backtracking stretch them over the rest of the file.
+BLOCK_COMMENT = r'/\*[^*]*\*+(?:[^/*][^*]*\*+)*/'
+LINE_COMMENT = r'//[^\n]*'
+HASH_COMMENT = r'#[^\n]*'
+SHELL_COMMENT = r'#(?<![^\s;|&()]#)[^\n]*'
+XML_COMMENT = r'<!--[^-]*(?:-(?!->)[^-]*)*-->'
+# Text every match of each comment pattern starts with; content without any of them skips the pass
+COMMENT_MARKERS = {BLOCK_COMMENT: '/*', LINE_COMMENT: '//', HASH_COMMENT: '#', SHELL_COMMENT: '#', XML_COMMENT: '<!--'}
+# Text every literal that may span lines starts with; content without any of them can only
+# hide a comment marker inside a literal on the marker's own line
+MULTILINE_OPENERS = {TRIPLE_DOUBLE_QUOTED: '"""', TRIPLE_SINGLE_QUOTED: "'''", BACKTICK_QUOTED: '`',
+                     MULTILINE_DOUBLE_QUOTED: '"', SHELL_SINGLE_QUOTED: "'"}
+
+LANGUAGE_RULES = [
+    (['.c', '.cpp', '.h', '.hh', '.hpp', '.m', '.mm'], [DOUBLE_QUOTED, SINGLE_QUOTED], [BLOCK_COMMENT, LINE_COMMENT]),
+    (['.swift'], [TRIPLE_DOUBLE_QUOTED, DOUBLE_QUOTED], [BLOCK_COMMENT, LINE_COMMENT]),
+    (['.kt'], [TRIPLE_DOUBLE_QUOTED, DOUBLE_QUOTED, SINGLE_QUOTED], [BLOCK_COMMENT, LINE_COMMENT]),
+    (['.js', '.ts'], [DOUBLE_QUOTED, SINGLE_QUOTED, BACKTICK_QUOTED], [BLOCK_COMMENT, LINE_COMMENT]),
+    (['.rs'], [MULTILINE_DOUBLE_QUOTED, RUST_CHAR], [BLOCK_COMMENT, LINE_COMMENT]),
+    (['.py'], [TRIPLE_DOUBLE_QUOTED, TRIPLE_SINGLE_QUOTED, DOUBLE_QUOTED, SINGLE_QUOTED], [HASH_COMMENT]),
+    (['.rb'], [DOUBLE_QUOTED, SINGLE_QUOTED], [HASH_COMMENT]),
+    (['.sh'], [MULTILINE_DOUBLE_QUOTED, SHELL_SINGLE_QUOTED], [SHELL_COMMENT]),
+    (['.xml', '.xib', '.storyboard', '.md'], [], [XML_COMMENT]),
+    (['.json'], [DOUBLE_QUOTED], []),
+    (['.toml'], [TRIPLE_DOUBLE_QUOTED, TRIPLE_SINGLE_QUOTED, DOUBLE_QUOTED, TOML_LITERAL], []),
+]
+
+# Log prefixes for files that do not make it into the archive
+STATUS_MESSAGES = {
+    'ignored': 'Ignored',
+    'binary': 'Skipped (binary)',
+    'unsupported': 'Skipped',
+    'encoding': 'Skipped (encoding error)',
+}
+
+# How many files each worker may have queued ahead of the archive writer
+PENDING_TASKS_PER_JOB = 8
+
+# Bump when the cache database layout changes
+CACHE_SCHEMA_VERSION = '1'
+DEFAULT_CACHE_SIZE_MB = 256
+# Cache writes are committed in batches of this many, so the write lock is only held briefly
+CACHE_COMMIT_EVERY = 256
+# Seconds to wait for another tarty's write lock before carrying on without the cache
+CACHE_LOCK_TIMEOUT = 5
+
+# File names (without extension) that --max-tokens treats as entry points
+ENTRY_POINT_STEMS = {'main', '__main__', '__init__', 'index', 'app', 'lib', 'mod', 'setup', 'readme',
+                     'package', 'cargo', 'makefile', 'appdelegate'}
+PRIORITY_KEYS = ['entry', 'ext', 'recent', 'small', 'shallow']
+DEFAULT_PRIORITY = 'entry,ext,recent,small'
+TOKEN_WORD_PATTERN = re.compile(rb'\w+|[^\w\s]')
+
+# inotify(7) event bits used by --watch
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+INOTIFY_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+                      IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+INOTIFY_EVENT = struct.Struct('iIII')
+DEFAULT_DEBOUNCE_SECONDS = 0.3
+DEFAULT_POLL_INTERVAL_SECONDS = 1.0
+
+# Index trailer: a marker line, one '<json path>\t<offset>\t<length>' line per file sorted by
+# the encoded path, and a footer line giving the offset of the first index line and the count
+INDEX_MARKER = b"[[INDEX]]\n"
+INDEX_FOOTER_PATTERN = re.compile(rb'\[\[INDEX:(\d+):(\d+)\]\]\n\Z')
+INDEX_FOOTER_MAX_BYTES = 64
+
+# --compress output is a series of independently compressed blocks, concatenated as gzip
+# members, xz streams or zstd frames, which standard tools decompress as one stream
+COMPRESS_BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_COMPRESS_LEVELS = {'gzip': 6, 'xz': 6, 'zstd': 3}
+COMPRESS_LEVEL_RANGES = {'gzip': (0, 9), 'xz': (0, 9), 'zstd': (1, 22)}
+COMPRESSION_MAGIC = [(b'\x1f\x8b', 'gzip'), (b'\xfd7zXZ\x00', 'xz'), (b'\x28\xb5\x2f\xfd', 'zstd')]
+
+# Stage profiling for --profile, --profile-json and --cprofile, or the TOOL_PROFILE and
+# TOOL_CPROFILE environment variables. The tools of this repository are installed as single
+# files, so each one carries this same Profiler; keep the copies identical.
+NULL_STAGE = nullcontext()
+
+class Profiler:
+    # Times named stages and counts the files and bytes that go through them; reports them
+    # with the peak memory at exit. Disabled, stage(), add() and timed() return at once.
+
+    def __init__(self):
+        self.enabled = False
+        self.summary = False
+        self.json_path = None
+        self.cprofile = None
+        self.cprofile_path = None
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker starts with no stages of its own, see profiled_call()
+            os.register_at_fork(after_in_child=self.collect)
+
+    def configure(self, summary=False, json_path=None, cprofile_path=None):
+        # TOOL_PROFILE=1 prints the summary, any other value is the path of the JSON report
+        environment = os.environ.get('TOOL_PROFILE', '')
+        if environment == '1':
+            summary = True
+        elif environment and not json_path:
+            json_path = environment
+        self.summary = summary
+        self.json_path = json_path
+        self.cprofile_path = cprofile_path or os.environ.get('TOOL_CPROFILE') or None
+        self.enabled = summary or json_path is not None
+        if self.cprofile_path:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if self.enabled or self.cprofile:
+            atexit.register(self.report)
+        self.start = time.perf_counter()
+
+    def stage(self, name):
+        return self._stage(name) if self.enabled else NULL_STAGE
+
+    @contextmanager
+    def _stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds=0.0, files=0, nbytes=0, calls=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'files': 0, 'bytes': 0})
+            stage['seconds'] += seconds
+            stage['calls'] += calls
+            stage['files'] += files
+            stage['bytes'] += nbytes
+
+    def count(self, name, files=1, nbytes=0):
+        self.add(name, files=files, nbytes=nbytes, calls=0)
+
+    def collect(self):
+        # Returns the stages recorded so far and starts over
+        with self.lock:
+            stages, self.stages = self.stages, {}
+        return stages
+
+    def merge(self, stages):
+        for name, stage in stages.items():
+            self.add(name, stage['seconds'], stage['files'], stage['bytes'], stage['calls'])
+
+    def timed(self, name, iterable):
+        # Times the production of every item of a lazy iterable, such as a directory walk
+        return self._timed(name, iterable) if self.enabled else iterable
+
+    def _timed(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start, calls=0)
+                return
+            self.add(name, time.perf_counter() - start, files=1)
+            yield item
+
+    def report(self):
+        total = time.perf_counter() - self.start
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_path)
+            sys.stderr.write(f"cProfile statistics written to {self.cprofile_path}\n")
+        if not self.enabled:
+            return
+        try:
+            import resource
+            peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            peak_rss_kb = peak // 1024 if sys.platform == 'darwin' else peak
+        except ImportError:
+            peak_rss_kb = None
+        if self.summary:
+            sys.stderr.write(f"{'stage':<22}{'ms':>10}{'calls':>9}{'files':>9}{'MB':>10}{'MB/s':>9}\n")
+            for name, stage in self.stages.items():
+                megabytes = stage['bytes'] / (1024 * 1024)
+                rate = f"{megabytes / stage['seconds']:.1f}" if stage['bytes'] and stage['seconds'] else '-'
+                sys.stderr.write(f"{name:<22}{stage['seconds'] * 1000:>10.1f}{stage['calls']:>9}{stage['files']:>9}"
+                                 f"{megabytes:>10.2f}{rate:>9}\n")
+            sys.stderr.write(f"{'total':<22}{total * 1000:>10.1f}\n")
+            if peak_rss_kb is not None:
+                sys.stderr.write(f"{'peak RSS':<22}{peak_rss_kb / 1024:>10.1f} MB\n")
+        if self.json_path:
+            with open(self.json_path, 'w') as f:
+                json.dump({'tool': os.path.basename(sys.argv[0]), 'argv': sys.argv[1:], 'total_seconds': round(total, 6),
+                           'peak_rss_kb': peak_rss_kb, 'stages': self.stages}, f, indent=2)
+                f.write('\n')
+
+PROFILER = Profiler()
+
+def profiled_call(enabled, func, *args):
+    # Runs func on a worker process and returns (result, stages) so the parent can merge() the
+    # stages timed there, which would otherwise be lost with the worker; enabled carries the
+    # parent's setting to workers that are spawned rather than forked
+    PROFILER.enabled = enabled
+    result = func(*args)
+    return result, PROFILER.collect()
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', action='store_true', help='Print the time, files and bytes of each stage and the peak memory to stderr')
+    parser.add_argument('--profile-json', metavar='FILE', help='Write the stage profile as JSON to FILE')
+    parser.add_argument('--cprofile', metavar='FILE', help='Write cProfile statistics of the whole run to FILE')
+
+def last_matching_rule(spec: PathSpec, path: str) -> Optional[bool]:
+    # Within one ignore file the last matching pattern decides; None means no pattern matched
+    for pattern in reversed(spec.patterns):
+        if pattern.include is not None and pattern.regex.match(path):
+            return pattern.include
+    return None
+
+class IgnoreTree:
+    """Ignore rules of a directory tree: custom patterns, .git/info/exclude and every .gitignore.
+
+    Rules are applied the way git applies them: the deepest .gitignore with a matching pattern
+    decides, and nothing inside an ignored directory is looked at. Compiled specs are cached per
+    ignore file and reloaded only when the file changes.
+    """
+
+    def __init__(self, root_dir: str, custom_ignore_spec: PathSpec):
+        self.root_dir = root_dir
+        self.custom_ignore_spec = custom_ignore_spec
+        self._specs: Dict[str, Tuple[Tuple[int, int], PathSpec]] = {}
+
+    def _load_spec(self, ignore_path: str) -> Optional[PathSpec]:
+        try:
+            stat = os.stat(ignore_path)
+        except OSError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._specs.get(ignore_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(ignore_path, 'r', encoding='utf-8', errors='replace') as ignore_file:
+            spec = PathSpec.from_lines(GitWildMatchPattern, ignore_file.read().splitlines())
+        self._specs[ignore_path] = (key, spec)
+        return spec
+
+    def directory_rules(self, relative_dir: str, parent_rules: List[Tuple[str, PathSpec]]) -> List[Tuple[str, PathSpec]]:
+        # Returns (base directory, spec) pairs in effect inside relative_dir, deepest last
+        directory = os.path.join(self.root_dir, relative_dir)
+        rules = list(parent_rules)
+        if not relative_dir:
+            exclude_spec = self._load_spec(os.path.join(directory, '.git', 'info', 'exclude'))
+            if exclude_spec is not None:
+                rules.append(('', exclude_spec))
+        gitignore_spec = self._load_spec(os.path.join(directory, '.gitignore'))
+        if gitignore_spec is not None:
+            rules.append((relative_dir, gitignore_spec))
+        return rules
+
+    def is_ignored(self, relative_path: str, rules: List[Tuple[str, PathSpec]], is_dir: bool) -> bool:
+        name = os.path.basename(relative_path)
+        if (is_dir and name == '.git') or (not is_dir and name.startswith('.')):
+            return True
+
+        match_path = relative_path + '/' if is_dir else relative_path
+        if self.custom_ignore_spec.match_file(match_path):
+            return True
+        for base_dir, spec in reversed(rules):
+            decision = last_matching_rule(spec, match_path[len(base_dir) + 1:] if base_dir else match_path)
+            if decision is not None:
+                return decision
+        return False
 
 def is_binary(file_path: str) -> bool:
     try:
@@ -36,111 +334,1153 @@ def is_binary(file_path: str) -> bool:
     except IOError:
         return True
 
+def literal_alternatives(strings: List[str]) -> List[str]:
+    # re.split() keeps what capture groups match, but a group at the start of an alternative
+    # stops the regex engine from skipping straight to candidate characters. So each opening
+    # quote is matched as a plain character and captured again through a lookbehind.
+    by_quote = {}
+    for literal in strings:
+        by_quote.setdefault(literal[0], []).append(literal[1:])
+    return [f"{quote}(?<=(?P<open{index}>{quote}))(?P<body{index}>{'|'.join(rests)})"
+            for index, (quote, rests) in enumerate(by_quote.items())]
+
+def build_language_pattern(strings: List[str], comments: List[str], collapse_tags: bool) -> Optional[Pattern]:
+    # One alternation scanned left to right: a literal is consumed whole before a comment
+    # marker inside it can match, and only literals (and '>' of collapsed tag gaps) are kept.
+    alternatives = literal_alternatives(strings) + comments
+    if collapse_tags:
+        gap = f"(?:\\s|{'|'.join(comments)})" if comments else r'\s'
+        alternatives.append(f">(?<=(?P<tag_end>>)){gap}+(?=<)")
+    elif not comments:
+        return None
+    return re.compile('|'.join(alternatives))
+
+def build_language_patterns() -> Dict[str, Tuple[Optional[Pattern], Optional[Pattern], Tuple[str, ...]]]:
+    syntax = {}
+    for extensions, strings, comments in LANGUAGE_RULES:
+        for extension in extensions:
+            syntax[extension] = (strings, comments)
+
+    patterns = {}
+    for extension in ALL_EXTENSIONS:
+        strings, comments = syntax.get(extension, ([], []))
+        comment_pattern = build_language_pattern(strings, comments, False)
+        markers = tuple(sorted({COMMENT_MARKERS[comment] for comment in comments}))
+        if extension in MARKUP_EXTENSIONS and strings:
+            patterns[extension] = (comment_pattern, build_language_pattern(strings, comments, True), markers + ('<',))
+        else:
+            patterns[extension] = (comment_pattern, comment_pattern, markers)
+    return patterns
+
+def build_comment_scans() -> Dict[str, Tuple[Pattern, Tuple[str, ...], Tuple[str, ...]]]:
+    # Comment-only patterns for languages that also have literals, with every comment captured
+    # after its first character (a leading group would stop the engine from skipping ahead) and
+    # block comments followed by the rest of their last line
+    scans = {}
+    for extensions, strings, comments in LANGUAGE_RULES:
+        if not strings or not comments:
+            continue
+        alternatives = [f"{comment[0]}({comment[1:]})" + (r'(?=([^\n]*))' if comment == BLOCK_COMMENT else '')
+                        for comment in comments]
+        quotes = tuple(sorted({literal[0] for literal in strings}))
+        openers = tuple(sorted({MULTILINE_OPENERS[literal] for literal in strings if literal in MULTILINE_OPENERS}))
+        for extension in extensions:
+            scans[extension] = (re.compile('|'.join(alternatives)), quotes, openers)
+    return scans
+
+def quote_before_comment(pieces: List[str], stride: int, index: int, quote: str) -> bool:
+    # Whether quote is in the code between the start of its line and the comment that follows
+    # pieces[index]; a line may also start inside an earlier comment, and comments hold no code
+    while True:
+        text = pieces[index]
+        newline = text.rfind('\n')
+        if text.find(quote, newline + 1) >= 0:
+            return True
+        if newline >= 0 or index == 0 or any('\n' in group for group in pieces[index - stride + 1:index] if group):
+            return False
+        index -= stride
+
+def strip_marked_comments(content: str, file_extension: str) -> Optional[str]:
+    # Drops every comment with the comment-only pattern and checks afterwards that none of them
+    # could have been inside a literal, returning None when the literal-aware pass is needed.
+    # With no multi-line literal in the file, a marker inside a literal has the literal's
+    # opening quote earlier on its line and the same quote after it, in the would-be comment
+    # or the rest of its line; most files have no quote in any comment at all.
+    scan = COMMENT_SCANS.get(file_extension)
+    if scan is None:
+        return None
+    pattern, quotes, openers = scan
+    if any(opener in content for opener in openers):
+        return None
+    pieces = pattern.split(content)
+    stride = pattern.groups + 1
+    for offset in range(1, stride):
+        column = pieces[offset::stride]
+        found = ''.join(filter(None, column))
+        for quote in quotes:
+            if quote not in found:
+                continue
+            for index in [index for index, group in enumerate(column) if group and quote in group]:
+                if quote_before_comment(pieces, stride, index * stride, quote):
+                    return None
+    return ''.join(pieces[0::stride])
+
+def has_marker(content: str, markers: Tuple[str, ...]) -> bool:
+    # Substring searches are far cheaper than the literal-aware scan, which only matters where
+    # a marker appears; most files of some languages (and many small files) contain none
+    return any(marker in content for marker in markers)
+
 def remove_comments(content: str, file_extension: str) -> str:
-    if file_extension in ['.c', '.cpp', '.h', '.hh', '.hpp', '.m', '.mm', '.swift', '.js', '.ts', '.kt']:
-        content = re.sub(r'/\*[\s\S]*?\*/', '', content)
-        content = re.sub(r'//.*', '', content)
-    elif file_extension in ['.py', '.sh', '.rb']:
-        content = re.sub(r'#.*', '', content)
-    elif file_extension == '.rs':
-        content = re.sub(r'/\*[\s\S]*?\*/', '', content)
-        content = re.sub(r'//.*', '', content)
-    elif file_extension in ['.xml', '.xib', '.storyboard']:
-        content = re.sub(r'<!--[\s\S]*?-->', '', content)
-    elif file_extension == '.md':
-        content = re.sub(r'<!--[\s\S]*?-->', '', content)
-    return content
+    comment_pattern, _, markers = LANGUAGE_PATTERNS.get(file_extension, (None, None, ()))
+    if comment_pattern is None or not has_marker(content, markers):
+        return content
+    stripped = strip_marked_comments(content, file_extension)
+    if stripped is not None:
+        return stripped
+    return ''.join(filter(None, comment_pattern.split(content)))
 
 def compress_content(content: str, file_extension: str) -> str:
-    content = remove_comments(content, file_extension)
-    
-    if file_extension not in MARKUP_EXTENSIONS and file_extension != '.md':
-        lines = content.splitlines()
-        processed_lines = [line.strip() for line in lines if line.strip()]
-        content = '\n'.join(processed_lines)
-    elif file_extension in MARKUP_EXTENSIONS:
-        content = re.sub(r'>\s+<', '><', content)
-        lines = content.splitlines()
-        processed_lines = [line.strip() for line in lines if line.strip()]
-        content = '\n'.join(processed_lines)
-    else:  # Markdown files
-        lines = content.splitlines()
-        processed_lines = [line.strip() for line in lines]
-        content = '\n'.join(processed_lines)
-    
-    return content
-
-def process_directory(input_dir: str, quiet: bool, gitignore_spec: PathSpec, custom_ignore_spec: PathSpec) -> List[Tuple[str, str]]:
-    compressed_files = []
-    
-    for root, _, files in os.walk(input_dir):
+    # A single regex pass drops comments (and whitespace between markup tags) while keeping
+    # literals intact; line trimming then runs entirely inside C-level builtins.
+    comment_pattern, compress_pattern, markers = LANGUAGE_PATTERNS.get(file_extension, (None, None, ()))
+    if compress_pattern is not None and has_marker(content, markers):
+        stripped = strip_marked_comments(content, file_extension)
+        content = stripped if stripped is not None else ''.join(filter(None, compress_pattern.split(content)))
+    if file_extension in MARKUP_EXTENSIONS and compress_pattern is comment_pattern:
+        # Without literals to protect, a constant replacement stays in C and beats the gap alternative.
+        content = TAG_GAP.sub('><', content)
+
+    lines = map(str.strip, content.splitlines())
+    if file_extension == '.md':
+        return '\n'.join(lines)
+    return '\n'.join(filter(None, lines))
+
+TAG_GAP = re.compile(r'>\s+<')
+LANGUAGE_PATTERNS = build_language_patterns()
+COMMENT_SCANS = build_comment_scans()
+
+def process_data(data: bytes, file_extension: str) -> Tuple[str, bytes]:
+    if b'\0' in data[:1024]:
+        return 'binary', b''
+
+    if file_extension not in ALL_EXTENSIONS:
+        return 'unsupported', b''
+
+    try:
+        content = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return 'encoding', b''
+
+    with PROFILER.stage('transform'):
+        compressed = compress_content(content, file_extension).encode('utf-8')
+    PROFILER.count('transform', 1, len(data))
+    return 'added', compressed
+
+def process_file(file_path: str, file_extension: str) -> Tuple[str, bytes]:
+    if is_binary(file_path):
+        return 'binary', b''
+
+    if file_extension not in ALL_EXTENSIONS:
+        return 'unsupported', b''
+
+    with PROFILER.stage('read'), open(file_path, 'rb') as f:
+        data = f.read()
+    PROFILER.count('read', 1, len(data))
+    return process_data(data, file_extension)
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'tarty')
+
+def compression_rules_fingerprint() -> str:
+    # The compression rules are the code of this script, so any edit to it starts a fresh cache
+    digest = hashlib.sha256(CACHE_SCHEMA_VERSION.encode('utf-8'))
+    with open(os.path.abspath(__file__), 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+def content_digest(data: bytes, file_extension: str) -> str:
+    digest = hashlib.blake2b(file_extension.encode('utf-8'), digest_size=20)
+    digest.update(b'\0')
+    digest.update(data)
+    return digest.hexdigest()
+
+def warn_cache_unavailable(error: Exception) -> None:
+    sys.stderr.write(f"tarty: compressed content cache unavailable ({error}), continuing without it\n")
+
+class CompressionCache:
+    """On-disk cache of compressed file contents.
+
+    Entries are found by absolute path, size and mtime first. When those no longer match
+    (e.g. after a checkout touched the file) the content hash is used as a fallback, so only
+    files whose bytes actually changed are compressed again. Compressed bodies are evicted
+    least-recently-used first once the cache grows past max_bytes.
+
+    Writes are committed every CACHE_COMMIT_EVERY entries and at the end of each batch of
+    files, so other tarty processes sharing the cache are never locked out for long. If the
+    database stays locked, the cache disables itself and the run continues without it.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.used_digests = set()
+        self.pending_writes = 0
+        self.disabled = False
+        self.db_path = os.path.join(cache_dir, 'cache.sqlite3')
+        self.db = sqlite3.connect(self.db_path, timeout=CACHE_LOCK_TIMEOUT)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        fingerprint = compression_rules_fingerprint()
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+        if row is None or row[0] != fingerprint:
+            self.db.executescript('''
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS blobs;
+            ''')
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rules', ?)", (fingerprint,))
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT);
+            CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, content BLOB, nbytes INTEGER, last_used REAL);
+            CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+        ''')
+        self.db.commit()
+
+    def get(self, path: str, stat: os.stat_result) -> Optional[bytes]:
+        if self.disabled:
+            return None
+        try:
+            row = self.db.execute(
+                "SELECT blobs.digest, blobs.content FROM files JOIN blobs ON files.digest = blobs.digest "
+                "WHERE files.path = ? AND files.size = ? AND files.mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+        except sqlite3.OperationalError as e:
+            self._disable(e)
+            return None
+        if row is None:
+            return None
+        self.used_digests.add(row[0])
+        return row[1]
+
+    def remember(self, path: str, stat: os.stat_result, digest: str):
+        # Records that path now has the content of an existing blob, found by its digest
+        self.used_digests.add(digest)
+        self._write("INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, digest))
+
+    def put(self, path: str, stat: os.stat_result, digest: str, content: bytes):
+        self._write("INSERT OR REPLACE INTO blobs (digest, content, nbytes, last_used) VALUES (?, ?, ?, ?)",
+                    (digest, content, len(content), time.time()))
+        self._write("INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, digest))
+
+    def _write(self, statement: str, parameters: tuple):
+        if self.disabled:
+            return
+        try:
+            self.db.execute(statement, parameters)
+        except sqlite3.OperationalError as e:
+            self._disable(e)
+            return
+        self.pending_writes += 1
+        if self.pending_writes >= CACHE_COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        if self.disabled or not self.pending_writes:
+            return
+        try:
+            self.db.commit()
+        except sqlite3.OperationalError as e:
+            self._disable(e)
+        self.pending_writes = 0
+
+    def _disable(self, error: sqlite3.OperationalError):
+        # Typically "database is locked": another process kept the write lock past the timeout
+        warn_cache_unavailable(error)
+        self.disabled = True
+        try:
+            self.db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        if self.disabled:
+            self.db.close()
+            return
+        try:
+            self._evict()
+            self.db.commit()
+        except sqlite3.OperationalError as e:
+            self._disable(e)
+        self.db.close()
+
+    def _evict(self):
+        now = time.time()
+        self.db.executemany("UPDATE blobs SET last_used = ? WHERE digest = ?",
+                            ((now, digest) for digest in self.used_digests))
+        total_bytes = self.db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM blobs").fetchone()[0]
+        if total_bytes > self.max_bytes:
+            evicted = []
+            for digest, nbytes in self.db.execute("SELECT digest, nbytes FROM blobs ORDER BY last_used"):
+                if total_bytes <= self.max_bytes:
+                    break
+                evicted.append((digest,))
+                total_bytes -= nbytes
+            self.db.executemany("DELETE FROM blobs WHERE digest = ?", evicted)
+            self.db.execute("DELETE FROM files WHERE digest NOT IN (SELECT digest FROM blobs)")
+
+# Connection used by process_cached_file() to look up compressed contents by digest: the
+# cache's own connection in a single process, or one opened by open_cache_reader() in
+# each worker, since a sqlite connection cannot be shared across fork
+cache_reader: Optional[sqlite3.Connection] = None
+
+def open_cache_reader(db_path: str) -> None:
+    global cache_reader
+    cache_reader = sqlite3.connect(db_path, timeout=CACHE_LOCK_TIMEOUT)
+
+def process_cached_file(file_path: str, file_extension: str) -> Tuple[str, bytes, Optional[str], bool]:
+    # Reads and hashes the file, and only compresses it when no blob has the same digest;
+    # returns (status, compressed_content, digest, found in cache)
+    try:
+        with PROFILER.stage('read'), open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return (*process_file(file_path, file_extension), None, False)
+    PROFILER.count('read', 1, len(data))
+    digest = content_digest(data, file_extension)
+    try:
+        row = cache_reader.execute("SELECT content FROM blobs WHERE digest = ?", (digest,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row is not None:
+        return 'added', row[0], digest, True
+    return (*process_data(data, file_extension), digest, False)
+
+def walk_directory(input_dir: str, ignore_tree: IgnoreTree, directories: Optional[Set[str]] = None) -> Iterator[Tuple[str, str, bool]]:
+    # Ignored directories are pruned from the walk and reported once, with a trailing slash;
+    # every directory that is walked is added to directories, if given
+    rules_by_dir = {'': ignore_tree.directory_rules('', [])}
+    for root, dirnames, files in os.walk(input_dir):
+        if directories is not None:
+            directories.add(root)
+        relative_dir = os.path.relpath(root, input_dir)
+        relative_dir = '' if relative_dir == '.' else relative_dir
+        rules = rules_by_dir.pop(relative_dir)
+
         for file in files:
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, input_dir)
-            
-            if should_ignore_file(relative_path, gitignore_spec, custom_ignore_spec):
-                if not quiet:
-                    print(f"Ignored: {relative_path}")
-                continue
-            
-            _, file_extension = os.path.splitext(file)
-            
-            if is_binary(file_path):
-                if not quiet:
-                    print(f"Skipped (binary): {relative_path}")
+            relative_path = os.path.join(relative_dir, file)
+            yield os.path.join(root, file), relative_path, ignore_tree.is_ignored(relative_path, rules, False)
+
+        kept_dirnames = []
+        for dirname in dirnames:
+            relative_path = os.path.join(relative_dir, dirname)
+            if ignore_tree.is_ignored(relative_path, rules, True):
+                yield os.path.join(root, dirname), relative_path + '/', True
+            else:
+                kept_dirnames.append(dirname)
+                rules_by_dir[relative_path] = ignore_tree.directory_rules(relative_path, rules)
+        dirnames[:] = kept_dirnames
+
+def git_file_list(input_dir: str, untracked: bool, since: Optional[str]) -> List[str]:
+    # Paths come straight from the repository index, relative to input_dir; git applies its own
+    # ignore rules, so nothing is walked or matched here. Only local git commands are run.
+    def git(*arguments: str) -> List[str]:
+        result = subprocess.run(['git', '-C', input_dir, *arguments], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"git {arguments[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return [path for path in result.stdout.decode('utf-8', 'surrogateescape').split('\0') if path]
+
+    if since is not None:
+        paths = git('diff', '--name-only', '-z', '--relative', '--no-renames', '--diff-filter=ACMT', since, '--')
+    else:
+        paths = git('ls-files', '-z', '--cached')
+    if untracked:
+        paths += git('ls-files', '-z', '--others', '--exclude-standard')
+    return sorted(set(paths))
+
+def git_entries(input_dir: str, relative_paths: List[str], ignore_tree: IgnoreTree) -> Iterator[Tuple[str, str, bool]]:
+    # Only hidden files and custom patterns are checked; tracked files deleted from the work
+    # tree and submodule directories are left out
+    for git_path in relative_paths:
+        relative_path = git_path.replace('/', os.sep)
+        file_path = os.path.join(input_dir, relative_path)
+        if os.path.isfile(file_path):
+            yield file_path, relative_path, ignore_tree.is_ignored(relative_path, [], False)
+
+def ordered_results(tasks: Iterable[Tuple[object, Optional[Callable], tuple]], jobs: int,
+                    initializer: Optional[Callable] = None, initargs: tuple = ()) -> Iterator[Tuple[object, tuple]]:
+    # Each task is (key, func, args); a task without a func already carries its result in args.
+    # With jobs > 1 the calls run on a process pool while the caller keeps producing tasks, and
+    # results are yielded strictly in task order so output stays deterministic. initializer
+    # runs once in each worker process.
+    if jobs <= 1:
+        for key, func, args in tasks:
+            yield key, (func(*args) if func else args)
+        return
+
+    def finished(result):
+        if not isinstance(result, Future):
+            return result
+        # The stages the worker timed while reading and compressing come back with the result
+        result, stages = result.result()
+        PROFILER.merge(stages)
+        return result
+
+    window = jobs * PENDING_TASKS_PER_JOB
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initializer, initargs=initargs) as executor:
+        pending = deque()
+        for key, func, args in tasks:
+            pending.append((key, executor.submit(profiled_call, PROFILER.enabled, func, *args) if func else args))
+            while pending and (len(pending) >= window or not isinstance(pending[0][1], Future) or pending[0][1].done()):
+                key, result = pending.popleft()
+                yield key, finished(result)
+        while pending:
+            key, result = pending.popleft()
+            yield key, finished(result)
+
+def process_entries(entries: Iterable[Tuple[str, str, bool]], jobs: int = 1,
+                    cache: Optional[CompressionCache] = None) -> Iterator[Tuple[str, str, bytes]]:
+    # Yields (relative_path, status, compressed_content) for every entry, in entry order.
+    # Only the stat and the lookup by path, size and mtime happen here; reading, hashing and
+    # compressing cache misses run in the workers.
+    global cache_reader
+    def tasks():
+        for file_path, relative_path, ignored in entries:
+            if ignored:
+                yield (relative_path, None), None, ('ignored', b'')
                 continue
-            
-            if file_extension.lower() not in ALL_EXTENSIONS:
-                if not quiet:
-                    print(f"Skipped: {relative_path}")
+
+            _, file_extension = os.path.splitext(file_path)
+            file_extension = file_extension.lower()
+            if cache is None or cache.disabled or file_extension not in ALL_EXTENSIONS:
+                yield (relative_path, None), process_file, (file_path, file_extension)
                 continue
-            
+
+            cache_path = os.path.abspath(file_path)
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                compressed_content = compress_content(content, file_extension.lower())
-                compressed_files.append((relative_path, compressed_content))
-                
-                if not quiet:
-                    compressed_size = len(compressed_content.encode('utf-8'))
-                    print(f"Added: {relative_path} ({compressed_size} bytes)")
-            except UnicodeDecodeError:
-                if not quiet:
-                    print(f"Skipped (encoding error): {relative_path}")
-    
-    return compressed_files
-
-def create_custom_archive(compressed_files: List[Tuple[str, str]], output_file: str) -> int:
+                stat = os.stat(file_path)
+            except OSError:
+                # A broken symlink or a file that vanished: reported like any unreadable file
+                yield (relative_path, None), process_file, (file_path, file_extension)
+                continue
+            content = cache.get(cache_path, stat)
+            if content is not None:
+                yield (relative_path, None), None, ('added', content)
+            else:
+                yield (relative_path, (cache_path, stat)), process_cached_file, (file_path, file_extension)
+
+    initializer, initargs = None, ()
+    if cache is not None:
+        cache_reader = cache.db
+        initializer, initargs = open_cache_reader, (cache.db_path,)
+    for (relative_path, cache_key), result in ordered_results(tasks(), jobs, initializer, initargs):
+        status, compressed_content = result[:2]
+        if status == 'added' and cache_key is not None and result[2] is not None:
+            digest, found = result[2:]
+            if found:
+                cache.remember(*cache_key, digest)
+            else:
+                cache.put(*cache_key, digest, compressed_content)
+        yield relative_path, status, compressed_content
+    if cache is not None:
+        # Release the write lock between runs, and after every rebuild with --watch
+        cache.commit()
+
+def process_directory(entries: Iterable[Tuple[str, str, bool]], quiet: bool, jobs: int = 1,
+                      cache: Optional[CompressionCache] = None, log_stream: Optional[TextIO] = None) -> Iterator[Tuple[str, bytes]]:
+    log_stream = log_stream or sys.stdout
+    for relative_path, status, compressed_content in process_entries(entries, jobs, cache):
+        if not quiet:
+            if status == 'added':
+                print(f"Added: {relative_path} ({len(compressed_content)} bytes)", file=log_stream)
+            else:
+                print(f"{STATUS_MESSAGES[status]}: {relative_path}", file=log_stream)
+
+        if status == 'added':
+            yield relative_path, compressed_content
+
+def estimate_tokens_by_bytes(content: bytes) -> int:
+    return (len(content) + 3) // 4
+
+def estimate_tokens_by_words(content: bytes) -> int:
+    return len(TOKEN_WORD_PATTERN.findall(content))
+
+def load_tiktoken_estimator() -> Callable[[bytes], int]:
+    import tiktoken
+    encoding = tiktoken.get_encoding('cl100k_base')
+    return lambda content: len(encoding.encode_ordinary(content.decode('utf-8')))
+
+# Each entry builds an estimator; tiktoken is only imported when it is asked for
+TOKEN_ESTIMATORS: Dict[str, Callable[[], Callable[[bytes], int]]] = {
+    'bytes': lambda: estimate_tokens_by_bytes,
+    'words': lambda: estimate_tokens_by_words,
+    'tiktoken': load_tiktoken_estimator,
+}
+
+def parse_extension_weights(text: str) -> Dict[str, float]:
+    weights = {}
+    for item in filter(None, text.split(';')):
+        extension, _, weight = item.partition('=')
+        extension = extension.strip().lower()
+        weights[extension if extension.startswith('.') else '.' + extension] = float(weight)
+    return weights
+
+def priority_sort_key(priority: List[str], extension_weights: Dict[str, float]) -> Callable[[str, str], tuple]:
+    # Lower sorts first: entry points, heavier extensions, newer, smaller and shallower files
+    def sort_key(file_path: str, relative_path: str) -> tuple:
+        try:
+            stat = os.stat(file_path)
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            mtime_ns, size = 0, 0
+        stem, file_extension = os.path.splitext(os.path.basename(relative_path))
+        values = {
+            'entry': stem.lower() not in ENTRY_POINT_STEMS,
+            'ext': -extension_weights.get(file_extension.lower(), 1.0),
+            'recent': -mtime_ns,
+            'small': size,
+            'shallow': relative_path.count(os.sep),
+        }
+        return tuple(values[name] for name in priority)
+    return sort_key
+
+class TokenBudget:
+    """Token accounting for --max-tokens: what was kept, and what was dropped and why."""
+
+    def __init__(self, max_tokens: int, estimator: Callable[[bytes], int]):
+        self.max_tokens = max_tokens
+        self.estimator = estimator
+        self.used_tokens = 0
+        self.dropped: List[Tuple[str, Optional[int]]] = []
+
+    def try_add(self, relative_path: str, content: bytes) -> Tuple[bool, int]:
+        tokens = self.estimator(archive_header(relative_path)) + self.estimator(content)
+        if self.used_tokens + tokens > self.max_tokens:
+            self.dropped.append((relative_path, tokens))
+            return False, tokens
+        self.used_tokens += tokens
+        return True, tokens
+
+    def summary(self) -> str:
+        measured = sum(tokens for _, tokens in self.dropped if tokens is not None)
+        return (f"tarty token budget: {self.used_tokens} of {self.max_tokens} tokens used, "
+                f"{len(self.dropped)} files dropped (~{measured} tokens measured)")
+
+def process_within_budget(entries: Iterable[Tuple[str, str, bool]], quiet: bool, budget: TokenBudget,
+                          sort_key: Callable[[str, str], tuple], jobs: int = 1, cache: Optional[CompressionCache] = None,
+                          log_stream: Optional[TextIO] = None) -> Iterator[Tuple[str, bytes]]:
+    # Files are compressed in priority order and kept greedily while they fit; the kept ones
+    # are then written in walk order, so memory is bounded by the budget rather than the tree.
+    log_stream = log_stream or sys.stdout
+    walked = list(entries)
+    ranked = []
+    for index, (file_path, relative_path, ignored) in enumerate(walked):
+        if ignored:
+            if not quiet:
+                print(f"{STATUS_MESSAGES['ignored']}: {relative_path}", file=log_stream)
+        else:
+            ranked.append((sort_key(file_path, relative_path), index))
+    ranked.sort()
+
+    selected = {}
+    results = process_entries((walked[index] for _, index in ranked), jobs, cache)
+    processed = 0
+    for relative_path, status, compressed_content in results:
+        index = ranked[processed][1]
+        processed += 1
+        if status != 'added':
+            if not quiet:
+                print(f"{STATUS_MESSAGES[status]}: {relative_path}", file=log_stream)
+            continue
+
+        kept, tokens = budget.try_add(relative_path, compressed_content)
+        if kept:
+            selected[index] = (relative_path, compressed_content)
+        if not quiet:
+            verb = 'Added' if kept else 'Dropped'
+            print(f"{verb}: {relative_path} ({len(compressed_content)} bytes, ~{tokens} tokens)", file=log_stream)
+        if budget.used_tokens >= budget.max_tokens:
+            break
+    results.close()
+
+    for _, index in ranked[processed:]:
+        relative_path = walked[index][1]
+        budget.dropped.append((relative_path, None))
+        if not quiet:
+            print(f"Dropped: {relative_path} (budget exhausted)", file=log_stream)
+
+    for index in sorted(selected):
+        yield selected[index]
+
+def archive_header(file_path: str, original_path: Optional[str] = None, length: Optional[int] = None) -> bytes:
+    if original_path is not None:
+        return f"[[FILE:{file_path}=>{original_path}]]\n".encode('utf-8')
+    if length is not None:
+        # Framed records state their body length, so bodies containing '[[FILE:' cannot break parsing
+        return f"[[FILE:{file_path}:{length}]]\n".encode('utf-8')
+    return f"[[FILE:{file_path}]]\n".encode('utf-8')
+
+class Deduplicator:
+    """Remembers each distinct compressed body so repeats can be written as references."""
+
+    def __init__(self):
+        self.first_paths: Dict[bytes, str] = {}
+        self.duplicate_files = 0
+        self.saved_bytes = 0
+
+    def original_path(self, file_path: str, content: bytes, record_bytes: int) -> Optional[str]:
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        original_path = self.first_paths.get(digest)
+        if original_path is None:
+            self.first_paths[digest] = file_path
+            return None
+        saved = record_bytes - len(archive_header(file_path, original_path))
+        if saved <= 0:
+            return None
+        self.duplicate_files += 1
+        self.saved_bytes += saved
+        return original_path
+
+    def summary(self) -> str:
+        return f"tarty dedupe: {self.duplicate_files} duplicate files written as references, {self.saved_bytes} bytes saved"
+
+def write_index(locations: List[Tuple[str, int, int]], f: BinaryIO, index_offset: int) -> int:
+    lines = sorted(json.dumps(file_path, ensure_ascii=False).encode('utf-8') + f"\t{offset}\t{length}\n".encode('ascii')
+                   for file_path, offset, length in locations)
+    f.write(INDEX_MARKER)
+    f.writelines(lines)
+    footer = f"[[INDEX:{index_offset + len(INDEX_MARKER)}:{len(lines)}]]\n".encode('ascii')
+    f.write(footer)
+    return len(INDEX_MARKER) + sum(map(len, lines)) + len(footer)
+
+def write_archive(compressed_files: Iterable[Tuple[str, bytes]], f: BinaryIO, deduplicator: Optional[Deduplicator] = None,
+                  framed: bool = False, indexed: bool = False) -> int:
     total_bytes = 0
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for file_path, content in compressed_files:
-            header = f"[[FILE:{file_path}]]\n"
+    body_locations: Dict[str, Tuple[int, int]] = {}
+    locations: List[Tuple[str, int, int]] = []
+    for file_path, content in compressed_files:
+        header = archive_header(file_path, length=len(content) if framed else None)
+        original_path = deduplicator.original_path(file_path, content, len(header) + len(content) + 1) if deduplicator else None
+        if original_path is not None:
+            reference = archive_header(file_path, original_path)
+            f.write(reference)
+            total_bytes += len(reference)
+            if indexed:
+                locations.append((file_path, *body_locations[original_path]))
+            continue
+
+        with PROFILER.stage('write'):
             f.write(header)
             f.write(content)
-            f.write("\n")  # Add a single newline between files
-            total_bytes += len(header.encode('utf-8')) + len(content.encode('utf-8')) + 1  # +1 for the newline
+            f.write(b"\n")  # Add a single newline between files
+        PROFILER.count('write', 1, len(header) + len(content) + 1)
+        if indexed:
+            body_location = (total_bytes + len(header), len(content))
+            locations.append((file_path, *body_location))
+            if deduplicator:
+                body_locations[file_path] = body_location
+        total_bytes += len(header) + len(content) + 1  # +1 for the newline
 
+    if indexed:
+        total_bytes += write_index(locations, f, total_bytes)
     return total_bytes
 
+def block_compressor(method: str, level: int) -> Callable[[bytes], bytes]:
+    # xz and zstd are imported on demand: lzma is missing from some Python builds and
+    # zstandard is an optional package
+    if method == 'gzip':
+        return lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+    if method == 'xz':
+        import lzma
+        return lambda data: lzma.compress(data, preset=level)
+    import zstandard
+    return lambda data: zstandard.ZstdCompressor(level=level).compress(data)
+
+def decompressing_reader(f: BinaryIO, method: str) -> BinaryIO:
+    if method == 'gzip':
+        return gzip.GzipFile(fileobj=f)
+    if method == 'xz':
+        import lzma
+        return lzma.LZMAFile(f)
+    import zstandard
+    return zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+
+def detect_compression(f: BinaryIO) -> Optional[str]:
+    magic = f.read(6)
+    f.seek(0)
+    for prefix, method in COMPRESSION_MAGIC:
+        if magic.startswith(prefix):
+            return method
+    return None
+
+class CompressedWriter:
+    """Write-only stream for --compress that compresses blocks on a thread pool.
+
+    Writes are gathered into COMPRESS_BLOCK_SIZE blocks; each block is compressed on its own
+    thread (zlib, lzma and zstd release the GIL) and written out in order, with a bounded
+    number of blocks in flight so memory stays flat however large the archive gets.
+    """
+
+    def __init__(self, method: str, level: Optional[int] = None, threads: int = 1):
+        self.method = method
+        self.compress_block = block_compressor(method, DEFAULT_COMPRESS_LEVELS[method] if level is None else level)
+        self.threads = threads
+        self.compressed_bytes = 0
+
+    def open(self, f: BinaryIO) -> 'CompressedWriter':
+        self.f = f
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        self.pending = deque()
+        self.blocks = 0
+        self.buffer = []
+        self.buffered = 0
+        return self
+
+    def write(self, data: bytes) -> int:
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= COMPRESS_BLOCK_SIZE:
+            self._submit_block()
+        return len(data)
+
+    def writelines(self, lines: Iterable[bytes]) -> None:
+        for line in lines:
+            self.write(line)
+
+    def _submit_block(self) -> None:
+        block = b''.join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        self.blocks += 1
+        self.pending.append(self.executor.submit(self._compress, block))
+        while self.pending and (len(self.pending) > self.threads * 2 or self.pending[0].done()):
+            self._write_block()
+
+    def _compress(self, block: bytes) -> bytes:
+        with PROFILER.stage('encode'):
+            data = self.compress_block(block)
+        PROFILER.count('encode', 0, len(block))
+        return data
+
+    def _write_block(self) -> None:
+        data = self.pending.popleft().result()
+        self.f.write(data)
+        self.compressed_bytes += len(data)
+
+    def close(self) -> None:
+        # An empty archive still gets one (empty) block, so readers see a valid stream
+        if self.buffered or not self.blocks:
+            self._submit_block()
+        while self.pending:
+            self._write_block()
+        self.executor.shutdown()
+
+def create_custom_archive(compressed_files: Iterable[Tuple[str, bytes]], output_file: str,
+                          deduplicator: Optional[Deduplicator] = None, framed: bool = False, indexed: bool = False,
+                          compressed_writer: Optional[CompressedWriter] = None) -> int:
+    # Records are written as they arrive, so memory stays bounded by the files in flight
+    def write(f: BinaryIO) -> int:
+        if compressed_writer is None:
+            return write_archive(compressed_files, f, deduplicator, framed, indexed)
+        stream = compressed_writer.open(f)
+        try:
+            return write_archive(compressed_files, stream, deduplicator, framed, indexed)
+        finally:
+            stream.close()
+
+    if output_file == '-':
+        total_bytes = write(sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+        return total_bytes
+
+    with open(output_file, 'wb') as f:
+        return write(f)
+
+class ArchiveReader:
+    """Random access to an archive written with --index, through its memory-mapped trailer.
+
+    A compressed archive is first decompressed into a temporary file, which is then mapped.
+    """
+
+    def __init__(self, archive_path: str):
+        self.file = open(archive_path, 'rb')
+        method = detect_compression(self.file)
+        if method is not None:
+            with self.file, decompressing_reader(self.file, method) as reader:
+                self.file = tempfile.TemporaryFile()
+                shutil.copyfileobj(reader, self.file)
+            self.file.flush()
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self.file.close()
+            raise ValueError(f"{archive_path} has no index; create it with --index")
+        footer_start = max(0, len(self.map) - INDEX_FOOTER_MAX_BYTES)
+        footer_start = self.map.rfind(b"\n", footer_start, len(self.map) - 1) + 1 or footer_start
+        match = INDEX_FOOTER_PATTERN.match(self.map[footer_start:])
+        if match is None:
+            self.close()
+            raise ValueError(f"{archive_path} has no index; create it with --index")
+        self.index_start = int(match.group(1))
+        self.index_end = footer_start
+        self.count = int(match.group(2))
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self) -> 'ArchiveReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Tuple[bytes, int, int]:
+        key, offset, length = line.rsplit(b"\t", 2)
+        return key, int(offset), int(length)
+
+    def entries(self) -> Iterator[Tuple[str, int, int]]:
+        position = self.index_start
+        while position < self.index_end:
+            line_end = self.map.find(b"\n", position, self.index_end)
+            key, offset, length = self._parse_line(self.map[position:line_end])
+            yield json.loads(key), offset, length
+            position = line_end + 1
+
+    def read(self, file_path: str) -> Optional[bytes]:
+        # Binary search over the sorted index lines, so lookups touch O(log n) pages of the map
+        key = json.dumps(file_path, ensure_ascii=False).encode('utf-8')
+        low, high = self.index_start, self.index_end
+        while low < high:
+            newline = self.map.rfind(b"\n", low, (low + high) // 2)
+            line_start = newline + 1 if newline >= 0 else low
+            line_end = self.map.find(b"\n", line_start, high)
+            line_key, offset, length = self._parse_line(self.map[line_start:line_end])
+            if line_key == key:
+                return self.map[offset:offset + length]
+            if line_key < key:
+                low = line_end + 1
+            else:
+                high = line_start
+        return None
+
+def list_archive(archive_path: str) -> None:
+    with ArchiveReader(archive_path) as reader:
+        for file_path, _, length in reader.entries():
+            print(f"{file_path}\t{length}")
+
+def extract_from_archive(archive_path: str, file_path: str, output_file: Optional[str]) -> bool:
+    with ArchiveReader(archive_path) as reader:
+        content = reader.read(file_path)
+    if content is None:
+        return False
+    if output_file is None or output_file == '-':
+        sys.stdout.buffer.write(content)
+        sys.stdout.buffer.flush()
+    else:
+        with open(output_file, 'wb') as f:
+            f.write(content)
+    return True
+
+class InotifyWatcher:
+    """Directory change notification through Linux inotify, called with ctypes."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.paths: Dict[int, str] = {}
+        self.watched: Set[str] = set()
+
+    def _watch(self, directory: str) -> None:
+        wd = self._add_watch(self.fd, os.fsencode(directory), INOTIFY_WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == 2:  # ENOENT: removed before we got to it
+                return
+            raise OSError(error, f"inotify_add_watch {directory}: {os.strerror(error)}")
+        self.paths[wd] = directory
+        self.watched.add(directory)
+
+    def watch(self, directories: Set[str]) -> None:
+        for directory in directories - self.watched:
+            self._watch(directory)
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        # Returns whether anything changed within timeout (None waits indefinitely)
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + name_length].rstrip(b'\0')
+            offset += INOTIFY_EVENT.size + name_length
+            directory = self.paths.get(wd)
+            if mask & IN_IGNORED and directory is not None:
+                del self.paths[wd]
+                self.watched.discard(directory)
+            elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and directory is not None:
+                # Watch new directories right away, so files created in them are not missed
+                self._watch(os.path.join(directory, os.fsdecode(name)))
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Fallback for systems without inotify: every poll interval counts as a possible change."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+
+    def watch(self, directories: Set[str]) -> None:
+        pass
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        # The rescan compares stat results, so an unchanged tree costs one walk per interval
+        if timeout is not None:
+            return False
+        time.sleep(self.interval)
+        return True
+
+    def close(self) -> None:
+        pass
+
+def watch_archive(list_entries: Callable[[Set[str]], Iterable[Tuple[str, str, bool]]], output_file: str,
+                  write_archive_file: Callable[[Iterable[Tuple[str, bytes]], str], int], quiet: bool, jobs: int,
+                  cache: Optional[CompressionCache], debounce: float, poll_interval: float, poll: bool) -> None:
+    # Compressed results stay in memory keyed by path and stat signature; after each burst of
+    # changes only new or modified files are compressed again, and the whole archive is
+    # written to a temporary file next to output_file and renamed over it.
+    results: Dict[str, Tuple[Tuple[int, int, int], Optional[bytes]]] = {}
+    output_path = os.path.abspath(output_file)
+    temp_file = os.path.join(os.path.dirname(os.path.abspath(output_file)), f".{os.path.basename(output_file)}.{os.getpid()}.tmp")
+
+    watcher = PollingWatcher(poll_interval)
+    if not poll:
+        try:
+            watcher = InotifyWatcher()
+        except (OSError, AttributeError):
+            sys.stderr.write("tarty: inotify is not available, polling for changes\n")
+
+    def rebuild() -> None:
+        nonlocal watcher
+        directories: Set[str] = set()
+        order = []
+        changed = []
+        for file_path, relative_path, ignored in list_entries(directories):
+            if ignored or os.path.abspath(file_path) == output_path:
+                continue
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            directories.add(os.path.dirname(file_path))
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            order.append((relative_path, signature))
+            cached = results.get(relative_path)
+            if cached is None or cached[0] != signature:
+                changed.append((file_path, relative_path, False))
+
+        try:
+            watcher.watch(directories)
+        except OSError as e:
+            sys.stderr.write(f"tarty: {e}; polling for changes instead\n")
+            watcher.close()
+            watcher = PollingWatcher(poll_interval)
+
+        current_paths = {relative_path for relative_path, _ in order}
+        removed = [relative_path for relative_path in results if relative_path not in current_paths]
+        signatures = dict(order)
+        for relative_path, status, compressed_content in process_entries(changed, jobs, cache):
+            results[relative_path] = (signatures[relative_path], compressed_content if status == 'added' else None)
+            if not quiet:
+                print(f"Updated: {relative_path}" if status == 'added' else f"{STATUS_MESSAGES[status]}: {relative_path}")
+        for relative_path in removed:
+            del results[relative_path]
+            if not quiet:
+                print(f"Removed: {relative_path}")
+        if not changed and not removed and os.path.exists(output_file):
+            return
+
+        records = ((relative_path, results[relative_path][1]) for relative_path, _ in order if results[relative_path][1] is not None)
+        try:
+            total_bytes = write_archive_file(records, temp_file)
+            os.replace(temp_file, output_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        sys.stderr.write(f"tarty archive updated: {output_file} ({total_bytes} bytes, "
+                         f"{len(changed)} changed, {len(removed)} removed)\n")
+
+    try:
+        rebuild()
+        while True:
+            if not watcher.wait(None):
+                continue
+            # Let a burst of saves settle into a single rewrite
+            while watcher.wait(debounce):
+                pass
+            rebuild()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
 def main():
     parser = argparse.ArgumentParser(description="Create compressed custom archives for AI ingestion.")
-    parser.add_argument("-i", "--input_dir", required=True, help="Input directory containing files to process")
-    parser.add_argument("-o", "--output_file", required=True, help="Output archive file name")
+    parser.add_argument("-i", "--input_dir", required=True, help="Input directory containing files to process, or the archive for --list/--extract")
+    parser.add_argument("-o", "--output_file", help="Output archive file name, or - to write to stdout; with --extract, the extracted file (default: stdout)")
     parser.add_argument("-q", "--quiet", action="store_true", help="Suppress output of processed files")
     parser.add_argument("--ignore", help="Additional patterns to ignore, separated by semicolons")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes used to compress files (default: 1)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or update the compressed content cache")
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="Directory of the compressed content cache (default: %(default)s)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE_MB, help="Maximum cache size in MB (default: %(default)s)")
+    parser.add_argument("--dedupe", action="store_true", help="Write files whose compressed content was already archived as references")
+    parser.add_argument("--framed", action="store_true", help="Include each file's content length in its header")
+    parser.add_argument("--index", action="store_true", help="Append an index of file offsets for --list and --extract")
+    parser.add_argument("--compress", choices=sorted(DEFAULT_COMPRESS_LEVELS), help="Compress the archive with gzip, xz or zstd")
+    parser.add_argument("--compress-level", type=int, help="Compression level: 0-9 for gzip and xz, 1-22 for zstd (default: 6 for gzip and xz, 3 for zstd)")
+    parser.add_argument("--compress-threads", type=int, default=os.cpu_count() or 1,
+                        help="Threads compressing archive blocks in parallel (default: %(default)s)")
+    parser.add_argument("--list", action="store_true", help="List the files of an indexed archive given with -i")
+    parser.add_argument("--extract", metavar="PATH", help="Extract one file from an indexed archive given with -i")
+    parser.add_argument("--git", action="store_true", help="List files from the git index of the input directory instead of walking it")
+    parser.add_argument("--untracked", action="store_true", help="With --git, also include untracked files that are not ignored")
+    parser.add_argument("--since", metavar="REV", help="Only archive files added or changed since this git revision (implies --git)")
+    parser.add_argument("--watch", action="store_true", help="Keep running and rewrite the archive whenever input files change")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE_SECONDS,
+                        help="With --watch, seconds without changes before the archive is rewritten (default: %(default)s)")
+    parser.add_argument("--poll", action="store_true", help="With --watch, poll for changes instead of using inotify")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL_SECONDS,
+                        help="With --watch, seconds between polls for changes (default: %(default)s)")
+    parser.add_argument("--max-tokens", type=int, help="Keep the archive within this many tokens, dropping lower-priority files")
+    parser.add_argument("--token-estimator", choices=sorted(TOKEN_ESTIMATORS), default='bytes',
+                        help="How tokens are counted for --max-tokens (default: %(default)s)")
+    parser.add_argument("--priority", default=DEFAULT_PRIORITY,
+                        help=f"Comma-separated order of file ranking keys for --max-tokens, from {', '.join(PRIORITY_KEYS)} (default: %(default)s)")
+    parser.add_argument("--ext-weights", default='', help="Extension weights for the ext ranking key, e.g. \".py=2;.md=0.5\" (default weight: 1)")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    PROFILER.configure(args.profile, args.profile_json, args.cprofile)
+
+    if args.list or args.extract is not None:
+        try:
+            if args.list:
+                list_archive(args.input_dir)
+            elif not extract_from_archive(args.input_dir, args.extract, args.output_file):
+                sys.exit(f"tarty: {args.extract} not found in {args.input_dir}")
+        except (OSError, ValueError) as e:
+            sys.exit(f"tarty: {e}")
+        return
+
+    if args.output_file is None:
+        parser.error("the following arguments are required: -o/--output_file")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.watch and args.output_file == '-':
+        parser.error("--watch needs an output file, not stdout")
+    if args.watch and args.max_tokens is not None:
+        parser.error("--watch cannot be combined with --max-tokens")
+
+    budget = None
+    if args.max_tokens is not None:
+        if args.max_tokens < 1:
+            parser.error("--max-tokens must be at least 1")
+        priority = [name.strip() for name in args.priority.split(',') if name.strip()]
+        unknown = [name for name in priority if name not in PRIORITY_KEYS]
+        if unknown:
+            parser.error(f"unknown --priority keys: {', '.join(unknown)}")
+        try:
+            sort_key = priority_sort_key(priority, parse_extension_weights(args.ext_weights))
+        except ValueError:
+            parser.error(f"invalid --ext-weights: {args.ext_weights}")
+        try:
+            budget = TokenBudget(args.max_tokens, TOKEN_ESTIMATORS[args.token_estimator]())
+        except ImportError:
+            parser.error(f"--token-estimator {args.token_estimator} requires the {args.token_estimator} package")
 
-    gitignore_spec = load_gitignore(args.input_dir)
-    
     custom_ignore_patterns = []
     if args.ignore:
         custom_ignore_patterns = args.ignore.split(';')
     custom_ignore_spec = PathSpec.from_lines(GitWildMatchPattern, custom_ignore_patterns)
+    ignore_tree = IgnoreTree(args.input_dir, custom_ignore_spec)
+    def list_entries(directories: Optional[Set[str]] = None) -> Iterable[Tuple[str, str, bool]]:
+        if args.git or args.since is not None or args.untracked:
+            try:
+                return git_entries(args.input_dir, git_file_list(args.input_dir, args.untracked, args.since), ignore_tree)
+            except (OSError, RuntimeError) as e:
+                sys.exit(f"tarty: {e}")
+        return walk_directory(args.input_dir, ignore_tree, directories)
+
+    # Keep stdout clean for the archive itself when streaming
+    log_stream = sys.stderr if args.output_file == '-' else sys.stdout
+
+    compressed_writer = None
+    if args.compress is None and args.compress_level is not None:
+        parser.error("--compress-level needs --compress")
+    if args.compress is not None:
+        if args.compress_threads < 1:
+            parser.error("--compress-threads must be at least 1")
+        lowest, highest = COMPRESS_LEVEL_RANGES[args.compress]
+        if args.compress_level is not None and not lowest <= args.compress_level <= highest:
+            parser.error(f"--compress-level for {args.compress} must be between {lowest} and {highest}")
+        try:
+            compressed_writer = CompressedWriter(args.compress, args.compress_level, args.compress_threads)
+        except ImportError:
+            parser.error("--compress zstd requires the zstandard package" if args.compress == 'zstd'
+                         else f"--compress {args.compress} is not supported by this Python build")
+
+    deduplicator = Deduplicator() if args.dedupe else None
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = CompressionCache(args.cache_dir, args.cache_size * 1024 * 1024)
+        except (OSError, sqlite3.Error) as e:
+            # A read-only or missing cache directory, or a database that cannot be opened
+            warn_cache_unavailable(e)
+    if args.watch:
+        def write_archive_file(compressed_files: Iterable[Tuple[str, bytes]], output_file: str) -> int:
+            writer = CompressedWriter(args.compress, args.compress_level, args.compress_threads) if args.compress else None
+            return create_custom_archive(compressed_files, output_file, Deduplicator() if args.dedupe else None,
+                                         args.framed, args.index, writer)
+        try:
+            watch_archive(list_entries, args.output_file, write_archive_file, args.quiet, args.jobs, cache,
+                          args.debounce, args.poll_interval, args.poll)
+        finally:
+            if cache is not None:
+                cache.close()
+        return
+
+    entries = PROFILER.timed('walk', list_entries())
+    try:
+        if budget is None:
+            compressed_files = process_directory(entries, args.quiet, args.jobs, cache, log_stream)
+        else:
+            compressed_files = process_within_budget(entries, args.quiet, budget, sort_key, args.jobs, cache, log_stream)
+        total_bytes = create_custom_archive(compressed_files, args.output_file, deduplicator, args.framed, args.index,
+                                            compressed_writer)
+    finally:
+        if cache is not None:
+            cache.close()
 
-    compressed_files = process_directory(args.input_dir, args.quiet, gitignore_spec, custom_ignore_spec)
-    total_bytes = create_custom_archive(compressed_files, args.output_file)
-    sys.stderr.write(f"tarty archive created: {args.output_file} ({total_bytes} bytes)\n")
+    output_name = 'stdout' if args.output_file == '-' else args.output_file
+    if compressed_writer is not None:
+        sys.stderr.write(f"tarty archive created: {output_name} ({total_bytes} bytes, "
+                         f"{compressed_writer.compressed_bytes} bytes {args.compress})\n")
+    else:
+        sys.stderr.write(f"tarty archive created: {output_name} ({total_bytes} bytes)\n")
+    if budget is not None:
+        sys.stderr.write(budget.summary() + "\n")
+    if deduplicator is not None:
+        sys.stderr.write(deduplicator.summary() + "\n")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
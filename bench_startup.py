@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+# Cold start benchmark for the tools of this repository.
+#
+# Starts every Python tool listed in install.toml with --help (or --args) in a fresh
+# interpreter and reports the best wall-clock time, the time spent importing modules (from
+# -X importtime, minus what the bare interpreter imports anyway) and the slowest top-level
+# imports.
+# --save keeps the results as JSON; --compare checks a run against saved results and exits
+# non-zero if a tool has become slower to start, so heavy imports creeping back to module
+# level are caught.
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+try:
+    import tomllib
+except ImportError:
+    import toml as tomllib
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def python_tools():
+    # Read as bytes and parsed from text, which both tomllib and the older toml package accept
+    with open(os.path.join(ROOT, 'install.toml'), 'rb') as f:
+        files = tomllib.loads(f.read().decode('utf-8'))['files']
+    return [path for path in files if path.endswith('.py')]
+
+def run(command):
+    start = time.perf_counter()
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, cwd=ROOT)
+    return time.perf_counter() - start, result
+
+def best_wall(command, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        seconds, result = run(command)
+        # Argument errors exit non-zero too and are worth timing; only a crash is a failure
+        if 'Traceback (most recent call last)' in result.stderr:
+            return None, result.stderr.strip().splitlines()[-1:]
+        best = min(best, seconds)
+    return best, None
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package", nested imports indented by two
+    # spaces; returns {module: (self us, cumulative us, depth)}
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+def measure(path, args, repeat, top, interpreter_modules):
+    command = [sys.executable, os.path.join(ROOT, path)] + args
+    wall, error = best_wall(command, repeat)
+    if error is not None:
+        return {'error': ' '.join(error)}
+    _, result = run([sys.executable, '-X', 'importtime'] + command[1:])
+    modules = {name: timing for name, timing in parse_importtime(result.stderr).items()
+               if name not in interpreter_modules}
+    heaviest = sorted(((name, cumulative) for name, (_, cumulative, depth) in modules.items() if depth == 0),
+                      key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'wall_ms': round(wall * 1000, 1),
+        'import_ms': round(sum(self_us for self_us, _, _ in modules.values()) / 1000, 1),
+        'modules': len(modules),
+        'heaviest': [[name, round(cumulative / 1000, 1)] for name, cumulative in heaviest],
+    }
+
+def compare(results, baseline, max_regression, min_delta):
+    regressions = []
+    for name, result in results['tools'].items():
+        before = baseline['tools'].get(name)
+        if before is None or 'wall_ms' not in before or 'wall_ms' not in result:
+            continue
+        delta = result['wall_ms'] - before['wall_ms']
+        if delta > min_delta and result['wall_ms'] > before['wall_ms'] * (1 + max_regression / 100):
+            regressions.append(f"{name}: {before['wall_ms']:.1f} ms -> {result['wall_ms']:.1f} ms (+{delta:.1f} ms)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start time of each tool and catch regressions.")
+    parser.add_argument("--args", default="--help",
+                        help="Arguments every tool is started with (default: %(default)s)")
+    parser.add_argument("--tool", action="append", default=[], metavar="NAME",
+                        help="Only measure tools whose path contains NAME; can be repeated")
+    parser.add_argument("--repeat", type=int, default=10, help="Starts per tool; the fastest is reported (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=3, help="Slowest top-level imports listed per tool (default: %(default)s)")
+    parser.add_argument("--save", metavar="FILE", help="Write the results as JSON to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against results saved with --save and fail on regressions")
+    parser.add_argument("--max-regression", type=float, default=25.0,
+                        help="With --compare, percentage by which a start may be slower (default: %(default)s)")
+    parser.add_argument("--min-delta", type=float, default=30.0,
+                        help="With --compare, milliseconds a start must be slower to count, ignoring noise (default: %(default)s)")
+    args = parser.parse_args()
+
+    interpreter_wall, _ = best_wall([sys.executable, '-c', 'pass'], args.repeat)
+    _, result = run([sys.executable, '-X', 'importtime', '-c', 'pass'])
+    interpreter_modules = set(parse_importtime(result.stderr))
+
+    results = {'python': sys.version.split()[0], 'args': args.args, 'interpreter_ms': round(interpreter_wall * 1000, 1), 'tools': {}}
+    print(f"{'tool':<32}{'wall ms':>9}{'import ms':>11}{'modules':>9}  slowest imports (cumulative ms)")
+    print(f"{'(interpreter)':<32}{interpreter_wall * 1000:>9.1f}")
+    for path in python_tools():
+        if args.tool and not any(name in path for name in args.tool):
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        measured = measure(path, args.args.split(), args.repeat, args.top, interpreter_modules)
+        results['tools'][name] = measured
+        if 'error' in measured:
+            print(f"{name:<32}  failed: {measured['error']}")
+            continue
+        heaviest = ', '.join(f"{module} {ms:.0f}" for module, ms in measured['heaviest'])
+        print(f"{name:<32}{measured['wall_ms']:>9.1f}{measured['import_ms']:>11.1f}{measured['modules']:>9}  {heaviest}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.max_regression, args.min_delta)
+        if regressions:
+            print("FAIL: slower start than " + args.compare)
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"OK: no tool starts slower than in {args.compare}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# Resize benchmark and quality check for mobile_generate_app_icons.
+#
+# Renders every icon size the script produces both the original way (each size resampled
+# from the full-resolution source, decoded once per platform) and through IconPyramid,
+# reports the time of each and the PSNR of every pyramid icon against the direct one, and
+# exits non-zero if any icon falls below --min-psnr.
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mobile_generate_app_icons as icons
+
+IOS_SIZES = [20, 40, 48, 57, 60, 80, 86, 87, 120, 172, 1024, 2048]
+# The original rendered the standard 1024 iOS icon a second time for the extra variants
+IOS_EXTRA_SIZES = [1024]
+ANDROID_SIZES = [36, 48, 72, 96, 144, 192, 512, 1024, 2048]
+
+def generate_source(path, side, seed):
+    """Write a synthetic icon: smooth gradients, hard-edged shapes and fine noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:side, 0:side] / side
+    rgb = np.stack([x, y, (x + y) / 2], axis=-1) * 200
+    for _ in range(12):
+        cx, cy, radius = rng.random(3) * [1, 1, 0.25]
+        inside = (x - cx) ** 2 + (y - cy) ** 2 < radius ** 2
+        rgb[inside] = rng.integers(0, 256, 3)
+    rgb += rng.normal(0, 6, rgb.shape)
+    alpha = np.full((side, side, 1), 255.0)
+    pixels = np.clip(np.concatenate([rgb, alpha], axis=-1), 0, 255).astype(np.uint8)
+    Image.fromarray(pixels, 'RGBA').save(path, 'PNG')
+
+def direct_icons(source_img):
+    """The original approach: one decode per platform, every size from the full source."""
+    rendered = {}
+    for sizes in (IOS_SIZES, IOS_EXTRA_SIZES, ANDROID_SIZES):
+        img = Image.open(source_img)
+        for size in sizes:
+            rendered[size] = icons.resize_image(img, (size, size))
+    return rendered
+
+def pyramid_icons(source_img):
+    pyramid = icons.IconPyramid(icons.load_source(source_img))
+    return {size: pyramid.icon(size) for size in sorted(set(IOS_SIZES + ANDROID_SIZES), reverse=True)}
+
+def psnr(a, b):
+    error = np.mean((np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)) ** 2)
+    return float('inf') if error == 0 else 10 * np.log10(255 ** 2 / error)
+
+def best_time(func, source_img, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(source_img)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IconPyramid against direct resizing and check its quality.")
+    parser.add_argument("--source", help="Source image to use instead of a generated one")
+    parser.add_argument("--side", type=int, default=4096, help="Side of the generated source in pixels (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the generated source (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported (default: %(default)s)")
+    parser.add_argument("--min-psnr", type=float, default=40.0,
+                        help="Lowest acceptable PSNR in dB of a pyramid icon against the direct one (default: %(default)s)")
+    args = parser.parse_args()
+
+    source_img = args.source
+    if not source_img:
+        source_img = os.path.join(os.environ.get('TMPDIR', '/tmp'), f'bench_icons_{args.side}_{args.seed}.png')
+        if not os.path.exists(source_img):
+            generate_source(source_img, args.side, args.seed)
+
+    direct_seconds, direct = best_time(direct_icons, source_img, args.repeat)
+    pyramid_seconds, pyramid = best_time(pyramid_icons, source_img, args.repeat)
+
+    print(f"{'size':>6}{'PSNR dB':>10}")
+    worst = float('inf')
+    for size in sorted(pyramid):
+        value = psnr(direct[size], pyramid[size])
+        worst = min(worst, value)
+        print(f"{size:>6}{value:>10.1f}")
+    print(f"direct  {direct_seconds * 1000:>8.0f} ms")
+    print(f"pyramid {pyramid_seconds * 1000:>8.0f} ms  ({direct_seconds / pyramid_seconds:.2f}x)")
+
+    if worst < args.min_psnr:
+        print(f"FAIL: lowest PSNR {worst:.1f} dB is below {args.min_psnr} dB")
+        sys.exit(1)
+    print(f"OK: lowest PSNR {worst:.1f} dB")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,40 @@
 #!/usr/bin/env python3
 
 import argparse
+import io
 import os
+import sys
+import json
+import atexit
+import hashlib
+import time
 import shutil
-from PIL import Image, ImageOps
-import numpy as np
-from rembg import remove
+import threading
+from contextlib import contextmanager, nullcontext
+# PIL, rembg and concurrent.futures are imported where they are first needed: --help,
+# argument errors and runs whose outputs are all up to date never load them, and rembg
+# (with onnxruntime) only loads when a dark or tinted icon is generated
 
-def resize_image(image, size):
-    """Resize image using aspect fill scale mode."""
+# Image files picked up when the source is a directory
+SOURCE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.webp']
+
+IOS_SIZES = [20, 40, 48, 57, 60, 80, 86, 87, 120, 172, 1024, 2048]
+ANDROID_SIZES = {
+    36: 'mipmap-ldpi',
+    48: 'mipmap-mdpi',
+    72: 'mipmap-hdpi',
+    96: 'mipmap-xhdpi',
+    144: 'mipmap-xxhdpi',
+    192: 'mipmap-xxxhdpi'
+}
+ANDROID_STORE_SIZES = [512, 1024, 2048]
+
+# Bump whenever a code change alters the icons produced, so existing outputs are rebuilt
+TOOL_VERSION = 2
+OUTPUT_MANIFEST_NAME = '.icons_manifest.json'
+
+def crop_to_aspect(image, size):
+    """Center-crop image to the aspect ratio of size."""
     img_ratio = image.width / image.height
     target_ratio = size[0] / size[1]
     
@@ -23,37 +49,270 @@ def resize_image(image, size):
         top = (image.height - new_height) // 2
         image = image.crop((0, top, image.width, top + new_height))
     
-    return image.resize(size, Image.LANCZOS)
+    return image
 
-def generate_ios_icons(source_img, output_dir):
-    sizes = [20, 40, 48, 57, 60, 80, 86, 87, 120, 172, 1024, 2048]
+def resize_image(image, size):
+    """Resize image using aspect fill scale mode."""
+    from PIL import Image
+    return crop_to_aspect(image, size).resize(size, Image.LANCZOS)
+
+def load_source(source_img):
+    """Decode the source image once."""
+    from PIL import Image
     img = Image.open(source_img)
+    img.load()
+    if img.mode == 'P':
+        # Palette images can only be resized with nearest-neighbour sampling
+        img = img.convert('RGBA')
+    return img
+
+# Stage profiling for --profile, --profile-json and --cprofile, or the TOOL_PROFILE and
+# TOOL_CPROFILE environment variables. The tools of this repository are installed as single
+# files, so each one carries this same Profiler; keep the copies identical.
+NULL_STAGE = nullcontext()
+
+class Profiler:
+    # Times named stages and counts the files and bytes that go through them; reports them
+    # with the peak memory at exit. Disabled, stage(), add() and timed() return at once.
+
+    def __init__(self):
+        self.enabled = False
+        self.summary = False
+        self.json_path = None
+        self.cprofile = None
+        self.cprofile_path = None
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker starts with no stages of its own, see profiled_call()
+            os.register_at_fork(after_in_child=self.collect)
+
+    def configure(self, summary=False, json_path=None, cprofile_path=None):
+        # TOOL_PROFILE=1 prints the summary, any other value is the path of the JSON report
+        environment = os.environ.get('TOOL_PROFILE', '')
+        if environment == '1':
+            summary = True
+        elif environment and not json_path:
+            json_path = environment
+        self.summary = summary
+        self.json_path = json_path
+        self.cprofile_path = cprofile_path or os.environ.get('TOOL_CPROFILE') or None
+        self.enabled = summary or json_path is not None
+        if self.cprofile_path:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if self.enabled or self.cprofile:
+            atexit.register(self.report)
+        self.start = time.perf_counter()
+
+    def stage(self, name):
+        return self._stage(name) if self.enabled else NULL_STAGE
+
+    @contextmanager
+    def _stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds=0.0, files=0, nbytes=0, calls=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'files': 0, 'bytes': 0})
+            stage['seconds'] += seconds
+            stage['calls'] += calls
+            stage['files'] += files
+            stage['bytes'] += nbytes
+
+    def count(self, name, files=1, nbytes=0):
+        self.add(name, files=files, nbytes=nbytes, calls=0)
+
+    def collect(self):
+        # Returns the stages recorded so far and starts over
+        with self.lock:
+            stages, self.stages = self.stages, {}
+        return stages
+
+    def merge(self, stages):
+        for name, stage in stages.items():
+            self.add(name, stage['seconds'], stage['files'], stage['bytes'], stage['calls'])
+
+    def timed(self, name, iterable):
+        # Times the production of every item of a lazy iterable, such as a directory walk
+        return self._timed(name, iterable) if self.enabled else iterable
+
+    def _timed(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start, calls=0)
+                return
+            self.add(name, time.perf_counter() - start, files=1)
+            yield item
+
+    def report(self):
+        total = time.perf_counter() - self.start
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_path)
+            sys.stderr.write(f"cProfile statistics written to {self.cprofile_path}\n")
+        if not self.enabled:
+            return
+        try:
+            import resource
+            peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            peak_rss_kb = peak // 1024 if sys.platform == 'darwin' else peak
+        except ImportError:
+            peak_rss_kb = None
+        if self.summary:
+            sys.stderr.write(f"{'stage':<22}{'ms':>10}{'calls':>9}{'files':>9}{'MB':>10}{'MB/s':>9}\n")
+            for name, stage in self.stages.items():
+                megabytes = stage['bytes'] / (1024 * 1024)
+                rate = f"{megabytes / stage['seconds']:.1f}" if stage['bytes'] and stage['seconds'] else '-'
+                sys.stderr.write(f"{name:<22}{stage['seconds'] * 1000:>10.1f}{stage['calls']:>9}{stage['files']:>9}"
+                                 f"{megabytes:>10.2f}{rate:>9}\n")
+            sys.stderr.write(f"{'total':<22}{total * 1000:>10.1f}\n")
+            if peak_rss_kb is not None:
+                sys.stderr.write(f"{'peak RSS':<22}{peak_rss_kb / 1024:>10.1f} MB\n")
+        if self.json_path:
+            with open(self.json_path, 'w') as f:
+                json.dump({'tool': os.path.basename(sys.argv[0]), 'argv': sys.argv[1:], 'total_seconds': round(total, 6),
+                           'peak_rss_kb': peak_rss_kb, 'stages': self.stages}, f, indent=2)
+                f.write('\n')
+
+PROFILER = Profiler()
+
+def profiled_call(enabled, func, *args):
+    # Runs func on a worker process and returns (result, stages) so the parent can merge() the
+    # stages timed there, which would otherwise be lost with the worker; enabled carries the
+    # parent's setting to workers that are spawned rather than forked
+    PROFILER.enabled = enabled
+    result = func(*args)
+    return result, PROFILER.collect()
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', action='store_true', help='Print the time, files and bytes of each stage and the peak memory to stderr')
+    parser.add_argument('--profile-json', metavar='FILE', help='Write the stage profile as JSON to FILE')
+    parser.add_argument('--cprofile', metavar='FILE', help='Write cProfile statistics of the whole run to FILE')
+
+class IconPyramid:
+    """Square icons rendered from a downscale pyramid of the center-cropped source.
     
-    for size in sizes:
-        resized_img = resize_image(img, (size, size))
-        output_path = os.path.join(output_dir, 'iOS', f'{os.path.splitext(os.path.basename(source_img))[0]}-{size}.png')
+    Each level is half the size of the one above it. An icon is resampled from the
+    smallest level that is at least as large, so LANCZOS never reads more than four
+    times the pixels of its output, and each size is rendered only once.
+    """
+    
+    def __init__(self, image):
+        self.levels = [crop_to_aspect(image, (1, 1))]
+        self.icons = {}
+    
+    def level_for(self, size):
+        from PIL import Image
+        while self.levels[-1].width // 2 >= size:
+            level = self.levels[-1]
+            self.levels.append(level.resize((level.width // 2, level.height // 2), Image.LANCZOS))
+        for level in reversed(self.levels):
+            if level.width >= size:
+                return level
+        # Larger than the source: upscale from the source itself
+        return self.levels[0]
+    
+    def icon(self, size):
+        if size not in self.icons:
+            from PIL import Image
+            with PROFILER.stage('resize'):
+                level = self.level_for(size)
+                self.icons[size] = level if level.width == size else level.resize((size, size), Image.LANCZOS)
+        return self.icons[size]
+
+def encode_png(image, output_paths, png_options):
+    """Encode image to PNG once, write it to every output path and return the seconds and bytes taken."""
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', **png_options)
+    for output_path in output_paths:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        resized_img.save(output_path, 'PNG')
+        with open(output_path, 'wb') as f:
+            f.write(buffer.getbuffer())
+    return time.perf_counter() - start, buffer.tell()
+
+class IconWriter:
+    """Collects icons to save and encodes them as PNG, on worker processes when jobs > 1.
+    
+    An image saved to several paths (the 1024px icon for iOS and Android, say) is encoded
+    once. Icons are only queued by save(); flush() hands them to the workers, so encoding
+    can run while the main process removes the background, and close() waits for them all.
+    """
+    
+    def __init__(self, jobs, png_options):
+        from concurrent.futures import ProcessPoolExecutor
+        self.executor = ProcessPoolExecutor(jobs) if jobs > 1 else None
+        self.png_options = png_options
+        self.queued = {}
+        self.futures = []
+    
+    def save(self, image, output_path):
+        self.queued.setdefault(id(image), (image, []))[1].append(output_path)
     
-    # Generate additional iOS icons
-    generate_additional_ios_icons(source_img, output_dir)
+    def flush(self):
+        for image, output_paths in self.queued.values():
+            if self.executor is None:
+                seconds, nbytes = encode_png(image, output_paths, self.png_options)
+                PROFILER.add('encode', seconds, len(output_paths), nbytes)
+            else:
+                future = self.executor.submit(encode_png, image, output_paths, self.png_options)
+                self.futures.append((future, len(output_paths)))
+        self.queued = {}
     
-    print(f"iOS icons generated successfully in {os.path.join(output_dir, 'iOS')}")
+    def close(self):
+        self.flush()
+        if self.executor is not None:
+            with PROFILER.stage('encode (waiting)'):
+                for future, files in self.futures:
+                    # Time spent by the workers, which overlaps the other stages
+                    seconds, nbytes = future.result()
+                    PROFILER.add('encode', seconds, files, nbytes)
+            self.executor.shutdown()
 
-def generate_additional_ios_icons(source_img, output_dir):
-    img = Image.open(source_img)
-    img_name = os.path.splitext(os.path.basename(source_img))[0]
+def ios_outputs(img_name, output_dir):
+    """Output paths of the iOS icons, mapped to their (size, variant)."""
     ios_dir = os.path.join(output_dir, 'iOS')
+    outputs = {os.path.join(ios_dir, f'{img_name}-{size}.png'): (size, 'standard') for size in IOS_SIZES}
     
-    # 1. 1024px x 1024px standard icon
-    standard_icon = resize_image(img, (1024, 1024))
-    standard_icon.save(os.path.join(ios_dir, f'{img_name}-1024.png'), 'PNG')
+    # Standard, dark (only the subject on a transparent background) and tinted (grayscale
+    # subject) 1024px icons, also laid out as an asset catalog icon set for Xcode
+    for directory in [ios_dir, os.path.join(ios_dir, 'AppIcon.appiconset')]:
+        for variant in ['standard', 'dark', 'tinted']:
+            suffix = '' if variant == 'standard' else f'-{variant}'
+            outputs[os.path.join(directory, f'{img_name}-1024{suffix}.png')] = (1024, variant)
+    return outputs
+
+def android_outputs(output_dir):
+    """Output paths of the Android icons, mapped to their (size, variant)."""
+    outputs = {os.path.join(output_dir, 'Android', f'ic_launcher-{size}.png'): (size, 'standard') for size in ANDROID_STORE_SIZES}
+    for size, folder in ANDROID_SIZES.items():
+        outputs[os.path.join(output_dir, 'Android', 'res', folder, 'ic_launcher.png')] = (size, 'standard')
+    return outputs
+
+def remove_background(standard_icon, session):
+    """Return the dark and tinted variants of the standard 1024px icon."""
+    from PIL import Image, ImageOps
+    from rembg import remove
     
-    # 2. 1024px x 1024px with only the subject on a transparent background
-    subject_only = remove(standard_icon)
-    subject_only.save(os.path.join(ios_dir, f'{img_name}-1024-dark.png'), 'PNG')
+    # Only the subject on a transparent background
+    with PROFILER.stage('background removal'):
+        subject_only = remove(standard_icon, session=session)
     
-    # 3. 1024px x 1024px grayscale version of the subject on a transparent background
+    # Grayscale version of the subject on a transparent background
     grayscale = ImageOps.grayscale(subject_only).convert('RGBA')
     
     # Create a new image with the same alpha channel as the original
@@ -62,32 +321,21 @@ def generate_additional_ios_icons(source_img, output_dir):
     # Paste the grayscale image onto the new image, using the original alpha channel
     tinted.paste(grayscale, (0, 0), subject_only)
     
-    tinted.save(os.path.join(ios_dir, f'{img_name}-1024-tinted.png'), 'PNG')
-
-def generate_android_icons(source_img, output_dir):
-    sizes = {
-        36: 'mipmap-ldpi',
-        48: 'mipmap-mdpi',
-        72: 'mipmap-hdpi',
-        96: 'mipmap-xhdpi',
-        144: 'mipmap-xxhdpi',
-        192: 'mipmap-xxxhdpi'
-    }
-    img = Image.open(source_img)
-    
-    for size, folder in sizes.items():
-        resized_img = resize_image(img, (size, size))
-        output_path = os.path.join(output_dir, 'Android', 'res', folder, 'ic_launcher.png')
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        resized_img.save(output_path, 'PNG')
-    
-    for size in [512, 1024, 2048]:
-        resized_img = resize_image(img, (size, size))
-        output_path = os.path.join(output_dir, 'Android', f'ic_launcher-{size}.png')
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        resized_img.save(output_path, 'PNG')
+    return {'dark': subject_only, 'tinted': tinted}
+
+def generate_icons(pyramid, outputs, writer, session):
+    # Largest first, so the pyramid is built top-down once
+    standard = sorted((size, path) for path, (size, variant) in outputs.items() if variant == 'standard')
+    for size, output_path in reversed(standard):
+        writer.save(pyramid.icon(size), output_path)
     
-    print(f"Android icons generated successfully in {os.path.join(output_dir, 'Android')}")
+    variants = {path: variant for path, (_, variant) in outputs.items() if variant != 'standard'}
+    if variants:
+        # Start encoding the resized icons while the background is removed
+        writer.flush()
+        images = remove_background(pyramid.icon(1024), session)
+        for output_path, variant in variants.items():
+            writer.save(images[variant], output_path)
 
 def copy_source_image(source_img, output_dir):
     source_dir = os.path.join(output_dir, 'source')
@@ -96,37 +344,221 @@ def copy_source_image(source_img, output_dir):
     shutil.copy2(source_img, destination)
     print(f"Source image copied to {destination}")
 
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class OutputManifest:
+    """Record of the files in an output tree and what each was generated from.
+    
+    Each file is recorded with the hash of its source image, its configuration (platform,
+    size, variant and PNG options), the tool version and its size in bytes. A file whose
+    record still matches all of these is up to date and is not generated again.
+    """
+    
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, OUTPUT_MANIFEST_NAME)
+        self.output_dir = output_dir
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f)['files']
+        except (OSError, ValueError, KeyError, TypeError):
+            self.files = {}
+    
+    def entry(self, output_path, source_hash, config):
+        return {'source_sha256': source_hash, 'config': config, 'tool_version': TOOL_VERSION,
+                'bytes': os.path.getsize(output_path)}
+    
+    def is_current(self, output_path, source_hash, config):
+        if not os.path.isfile(output_path):
+            return False
+        return self.files.get(os.path.relpath(output_path, self.output_dir)) == self.entry(output_path, source_hash, config)
+    
+    def record(self, output_path, source_hash, config):
+        self.files[os.path.relpath(output_path, self.output_dir)] = self.entry(output_path, source_hash, config)
+    
+    def save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'tool_version': TOOL_VERSION, 'files': self.files}, f, indent=2, sort_keys=True)
+            f.write('\n')
+    
+    def write_contents_json(self):
+        """Write the Contents.json of the AppIcon.appiconset from the icons recorded in it."""
+        images = []
+        # The standard icon first, then its dark and tinted appearances
+        for relative_path, entry in sorted(self.files.items(), key=lambda item: (item[1]['config'].get('variant') != 'standard', item[0])):
+            directory, filename = os.path.split(relative_path)
+            if directory != os.path.join('iOS', 'AppIcon.appiconset'):
+                continue
+            size = entry['config']['size']
+            image = {'filename': filename, 'idiom': 'universal', 'platform': 'ios', 'size': f'{size}x{size}'}
+            if entry['config']['variant'] != 'standard':
+                image['appearances'] = [{'appearance': 'luminosity', 'value': entry['config']['variant']}]
+            images.append(image)
+        if images:
+            with open(os.path.join(self.output_dir, 'iOS', 'AppIcon.appiconset', 'Contents.json'), 'w', encoding='utf-8') as f:
+                json.dump({'images': images, 'info': {'author': 'xcode', 'version': 1}}, f, indent=2)
+                f.write('\n')
+
+def plan_outputs(source_img, output_dir, platform, png_options, force):
+    """Return every output of one app mapped to its configuration, and the stale ones among them."""
+    img_name = os.path.splitext(os.path.basename(source_img))[0]
+    outputs = {os.path.join(output_dir, 'source', os.path.basename(source_img)): {'variant': 'source'}}
+    if platform in ['iOS', 'all']:
+        for output_path, (size, variant) in ios_outputs(img_name, output_dir).items():
+            outputs[output_path] = {'platform': 'iOS', 'size': size, 'variant': variant, 'png': png_options}
+    if platform in ['Android', 'all']:
+        for output_path, (size, variant) in android_outputs(output_dir).items():
+            outputs[output_path] = {'platform': 'Android', 'size': size, 'variant': variant, 'png': png_options}
+    
+    source_hash = file_hash(source_img)
+    output_manifest = OutputManifest(output_dir)
+    stale = [output_path for output_path, config in outputs.items()
+             if force or not output_manifest.is_current(output_path, source_hash, config)]
+    return source_hash, output_manifest, outputs, stale
+
+def find_sources(source, manifest, output_dir):
+    """Return (source image, output directory) pairs for one image, a directory or a manifest."""
+    if manifest:
+        # JSON object mapping each app name to its source image, relative to the manifest
+        with open(manifest, 'r', encoding='utf-8') as f:
+            apps = json.load(f)
+        if not isinstance(apps, dict):
+            raise ValueError('expected a JSON object of app names and source images')
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        return [(os.path.join(base_dir, source_img), os.path.join(output_dir, name)) for name, source_img in apps.items()]
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS)
+        return [(os.path.join(source, name), os.path.join(output_dir, os.path.splitext(name)[0])) for name in names]
+    return [(source, output_dir)]
+
+def read_source(source_img):
+    """Decode and check one source image; returns the image or an error message."""
+    if not os.path.isfile(source_img):
+        return f"Error: Source image '{source_img}' not found."
+    with PROFILER.stage('decode'):
+        try:
+            img = load_source(source_img)
+        except OSError as e:
+            return f"Error: Cannot read source image '{source_img}': {e}"
+    PROFILER.count('decode', 1, os.path.getsize(source_img))
+    if img.width < 1024 or img.height < 1024:
+        return f"Error: Source image must be at least 1024x1024 pixels. Current size: {img.width}x{img.height}"
+    return img
+
+def generate_app_icons(source_img, img, output_dir, outputs, stale, writer, session):
+    # Create the output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Copy source image to output directory
+    if os.path.join(output_dir, 'source', os.path.basename(source_img)) in stale:
+        with PROFILER.stage('copy source'):
+            copy_source_image(source_img, output_dir)
+    
+    # Every output is rendered from the one decoded source
+    pyramid = IconPyramid(img)
+    generate_icons(pyramid, {output_path: (outputs[output_path]['size'], outputs[output_path]['variant'])
+                             for output_path in stale if outputs[output_path]['variant'] != 'source'},
+                   writer, session)
+    writer.flush()
+
 def main():
     parser = argparse.ArgumentParser(description='Generate mobile app icons for iOS and Android.')
-    parser.add_argument('source_img', help='Source PNG image file (at least 1024x1024 pixels)')
+    parser.add_argument('source_img', nargs='?',
+                        help='Source PNG image file (at least 1024x1024 pixels), or a directory of source images, one per app')
+    parser.add_argument('--manifest', help='JSON file mapping app names to source images, for generating many apps in one run')
     parser.add_argument('--platform', choices=['iOS', 'Android', 'all'], default='all', help='Target platform (default: all)')
     parser.add_argument('--output_dir', default='output', help='Output directory (default: output)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes encoding PNG files (default: number of CPUs)')
+    parser.add_argument('--png-level', type=int, choices=range(10), default=6, metavar='0-9',
+                        help='PNG compression level, 0 fastest to 9 smallest (default: 6)')
+    parser.add_argument('--optimize', action='store_true', help='Search for the smallest PNG encoding; slowest, implies level 9')
+    parser.add_argument('--timings', action='store_true', help='Same as --profile')
+    parser.add_argument('--force', action='store_true', help='Regenerate every output, even those that are up to date')
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
+    PROFILER.configure(args.profile or args.timings, args.profile_json, args.cprofile)
     
-    if not os.path.isfile(args.source_img):
-        print(f"Error: Source image '{args.source_img}' not found.")
-        return
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if (args.source_img is None) == (args.manifest is None):
+        parser.error('give either a source image or directory, or --manifest')
     
-    img = Image.open(args.source_img)
-    if img.width < 1024 or img.height < 1024:
-        print(f"Error: Source image must be at least 1024x1024 pixels. Current size: {img.width}x{img.height}")
-        return
+    try:
+        sources = find_sources(args.source_img, args.manifest, args.output_dir)
+    except (OSError, ValueError) as e:
+        print(f"Error: Cannot read manifest '{args.manifest}': {e}")
+        sys.exit(1)
+    if not sources:
+        print(f"Error: No source images found in '{args.source_img}'.")
+        sys.exit(1)
     
-    # Create the output directory if it doesn't exist
-    os.makedirs(args.output_dir, exist_ok=True)
+    png_options = {'compress_level': args.png_level, 'optimize': args.optimize}
+    # Only apps with outputs missing or out of date are decoded and generated
+    plans = []
+    failed = 0
+    for source_img, output_dir in sources:
+        if not os.path.isfile(source_img):
+            print(f"Error: Source image '{source_img}' not found.")
+            failed += 1
+            continue
+        with PROFILER.stage('plan'):
+            source_hash, output_manifest, outputs, stale = plan_outputs(source_img, output_dir, args.platform, png_options, args.force)
+        if stale:
+            plans.append((source_img, output_dir, source_hash, output_manifest, outputs, stale))
+        else:
+            print(f"Icons in {output_dir} are up to date")
     
-    # Copy source image to output directory
-    copy_source_image(args.source_img, args.output_dir)
+    # The segmentation model is loaded once, and only if a dark or tinted icon is needed
+    session = None
+    if any(outputs[output_path]['variant'] in ['dark', 'tinted'] for *_, outputs, stale in plans for output_path in stale):
+        with PROFILER.stage('model load'):
+            from rembg import new_session
+            session = new_session()
     
-    if args.platform in ['iOS', 'all']:
-        generate_ios_icons(args.source_img, args.output_dir)
+    generated = []
+    if plans:
+        from concurrent.futures import ThreadPoolExecutor
+        writer = IconWriter(args.jobs, png_options)
+        # The next image is decoded on a thread while the current one is processed, and its
+        # icons are encoded by the writer's workers while the following images are processed
+        with ThreadPoolExecutor(1) as decoder:
+            next_source = decoder.submit(read_source, plans[0][0])
+            for index, plan in enumerate(plans):
+                source_img, output_dir, _, _, outputs, stale = plan
+                img = next_source.result()
+                if index + 1 < len(plans):
+                    next_source = decoder.submit(read_source, plans[index + 1][0])
+                if isinstance(img, str):
+                    print(img)
+                    failed += 1
+                    continue
+                generate_app_icons(source_img, img, output_dir, outputs, stale, writer, session)
+                generated.append(plan)
+        writer.close()
     
-    if args.platform in ['Android', 'all']:
-        generate_android_icons(args.source_img, args.output_dir)
+    for source_img, output_dir, source_hash, output_manifest, outputs, stale in generated:
+        for output_path in stale:
+            output_manifest.record(output_path, source_hash, outputs[output_path])
+        output_manifest.save()
+        output_manifest.write_contents_json()
+        
+        if args.platform in ['iOS', 'all']:
+            print(f"iOS icons generated successfully in {os.path.join(output_dir, 'iOS')}")
+        if args.platform in ['Android', 'all']:
+            print(f"Android icons generated successfully in {os.path.join(output_dir, 'Android')}")
     
-    print(f"Icon generation completed for platform(s): {args.platform}")
-    print(f"All outputs have been saved to: {os.path.abspath(args.output_dir)}")
+    if len(sources) > failed:
+        print(f"Icon generation completed for platform(s): {args.platform}")
+        print(f"All outputs have been saved to: {os.path.abspath(args.output_dir)}")
+    if failed:
+        print(f"{failed} of {len(sources)} source images failed")
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# Table conversion benchmark for md_to_docx.
+#
+# Converts generated Markdown tables of growing size with convert_table_to_docx() and
+# with the original cell-by-cell implementation (kept below as legacy_convert_table),
+# and checks that both produce the same cell text.
+
+import os
+import sys
+import time
+import argparse
+from docx import Document
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import md_to_docx
+
+def legacy_convert_table(table, document, html_stash):
+    rows = list(table.iter('tr'))
+
+    if rows:
+        docx_table = document.add_table(rows=len(rows), cols=len([cell for cell in rows[0] if cell.tag in ('th', 'td')]))
+        docx_table.style = 'Table Grid'
+
+        for i, row in enumerate(rows):
+            cells = [cell for cell in row if cell.tag in ('th', 'td')]
+            for j, cell in enumerate(cells):
+                docx_table.cell(i, j).text = md_to_docx.element_text(cell, html_stash).strip()
+
+        document.add_paragraph()  # Add a blank line after the table
+
+def generate_table(rows, cols):
+    lines = ['| ' + ' | '.join(f'Column {j}' for j in range(cols)) + ' |',
+             '|' + '---|' * cols]
+    for i in range(rows):
+        lines.append('| ' + ' | '.join(f'value {i}.{j}' for j in range(cols)) + ' |')
+    return '\n'.join(lines) + '\n'
+
+def time_conversion(convert, table, html_stash, repeat):
+    best = float('inf')
+    document = None
+    for _ in range(repeat):
+        document = Document()
+        start = time.perf_counter()
+        convert(table, document, html_stash)
+        best = min(best, time.perf_counter() - start)
+    return best, [[cell.text for cell in row.cells] for row in document.tables[0].rows]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark md_to_docx table conversion against the cell-by-cell original.")
+    parser.add_argument("--rows", default="100,250,500,1000,2000,5000",
+                        help="Comma-separated table sizes in rows (default: %(default)s)")
+    parser.add_argument("--cols", type=int, default=5, help="Columns per table (default: %(default)s)")
+    parser.add_argument("--legacy-max-rows", type=int, default=250,
+                        help="Largest table to convert the legacy way, which takes quadratic time (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported (default: %(default)s)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>7}{'cells':>9}{'legacy ms':>12}{'bulk ms':>10}{'bulk rows/s':>13}{'speedup':>10}{'same text':>11}")
+    for rows in [int(value) for value in args.rows.split(',')]:
+        root, html_stash = md_to_docx.parse_markdown(generate_table(rows, args.cols))
+        table = root.find('table')
+
+        bulk, bulk_text = time_conversion(md_to_docx.convert_table_to_docx, table, html_stash, args.repeat)
+        if rows <= args.legacy_max_rows:
+            legacy, legacy_text = time_conversion(legacy_convert_table, table, html_stash, 1)
+            columns = f"{legacy * 1000:>12.0f}{bulk * 1000:>10.1f}{rows / bulk:>13.0f}{legacy / bulk:>9.0f}x"
+            columns += f"{'yes' if legacy_text == bulk_text else 'no':>11}"
+        else:
+            columns = f"{'-':>12}{bulk * 1000:>10.1f}{rows / bulk:>13.0f}{'-':>10}{'-':>11}"
+        print(f"{rows + 1:>7}{(rows + 1) * args.cols:>9}{columns}")
+
+if __name__ == "__main__":
+    main()
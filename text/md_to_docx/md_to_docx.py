@@ -1,18 +1,161 @@
 #!/usr/bin/env python3
+import os
+import re
 import sys
+import copy
+import glob
+import html
+import json
+import time
+import atexit
 import argparse
+import threading
 from pathlib import Path
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.section import WD_SECTION
-from docx.enum.style import WD_STYLE_TYPE
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-import markdown
-from bs4 import BeautifulSoup
+# python-docx, markdown and concurrent.futures are imported in the functions that use them,
+# so --help and argument errors return without loading them
+
+# Stage profiling for --profile, --profile-json and --cprofile, or the TOOL_PROFILE and
+# TOOL_CPROFILE environment variables. The tools of this repository are installed as single
+# files, so each one carries this same Profiler; keep the copies identical.
+NULL_STAGE = nullcontext()
+
+class Profiler:
+    # Times named stages and counts the files and bytes that go through them; reports them
+    # with the peak memory at exit. Disabled, stage(), add() and timed() return at once.
+
+    def __init__(self):
+        self.enabled = False
+        self.summary = False
+        self.json_path = None
+        self.cprofile = None
+        self.cprofile_path = None
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker starts with no stages of its own, see profiled_call()
+            os.register_at_fork(after_in_child=self.collect)
+
+    def configure(self, summary=False, json_path=None, cprofile_path=None):
+        # TOOL_PROFILE=1 prints the summary, any other value is the path of the JSON report
+        environment = os.environ.get('TOOL_PROFILE', '')
+        if environment == '1':
+            summary = True
+        elif environment and not json_path:
+            json_path = environment
+        self.summary = summary
+        self.json_path = json_path
+        self.cprofile_path = cprofile_path or os.environ.get('TOOL_CPROFILE') or None
+        self.enabled = summary or json_path is not None
+        if self.cprofile_path:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if self.enabled or self.cprofile:
+            atexit.register(self.report)
+        self.start = time.perf_counter()
+
+    def stage(self, name):
+        return self._stage(name) if self.enabled else NULL_STAGE
+
+    @contextmanager
+    def _stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds=0.0, files=0, nbytes=0, calls=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'files': 0, 'bytes': 0})
+            stage['seconds'] += seconds
+            stage['calls'] += calls
+            stage['files'] += files
+            stage['bytes'] += nbytes
+
+    def count(self, name, files=1, nbytes=0):
+        self.add(name, files=files, nbytes=nbytes, calls=0)
+
+    def collect(self):
+        # Returns the stages recorded so far and starts over
+        with self.lock:
+            stages, self.stages = self.stages, {}
+        return stages
+
+    def merge(self, stages):
+        for name, stage in stages.items():
+            self.add(name, stage['seconds'], stage['files'], stage['bytes'], stage['calls'])
+
+    def timed(self, name, iterable):
+        # Times the production of every item of a lazy iterable, such as a directory walk
+        return self._timed(name, iterable) if self.enabled else iterable
+
+    def _timed(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start, calls=0)
+                return
+            self.add(name, time.perf_counter() - start, files=1)
+            yield item
+
+    def report(self):
+        total = time.perf_counter() - self.start
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_path)
+            sys.stderr.write(f"cProfile statistics written to {self.cprofile_path}\n")
+        if not self.enabled:
+            return
+        try:
+            import resource
+            peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            peak_rss_kb = peak // 1024 if sys.platform == 'darwin' else peak
+        except ImportError:
+            peak_rss_kb = None
+        if self.summary:
+            sys.stderr.write(f"{'stage':<22}{'ms':>10}{'calls':>9}{'files':>9}{'MB':>10}{'MB/s':>9}\n")
+            for name, stage in self.stages.items():
+                megabytes = stage['bytes'] / (1024 * 1024)
+                rate = f"{megabytes / stage['seconds']:.1f}" if stage['bytes'] and stage['seconds'] else '-'
+                sys.stderr.write(f"{name:<22}{stage['seconds'] * 1000:>10.1f}{stage['calls']:>9}{stage['files']:>9}"
+                                 f"{megabytes:>10.2f}{rate:>9}\n")
+            sys.stderr.write(f"{'total':<22}{total * 1000:>10.1f}\n")
+            if peak_rss_kb is not None:
+                sys.stderr.write(f"{'peak RSS':<22}{peak_rss_kb / 1024:>10.1f} MB\n")
+        if self.json_path:
+            with open(self.json_path, 'w') as f:
+                json.dump({'tool': os.path.basename(sys.argv[0]), 'argv': sys.argv[1:], 'total_seconds': round(total, 6),
+                           'peak_rss_kb': peak_rss_kb, 'stages': self.stages}, f, indent=2)
+                f.write('\n')
+
+PROFILER = Profiler()
+
+def profiled_call(enabled, func, *args):
+    # Runs func on a worker process and returns (result, stages) so the parent can merge() the
+    # stages timed there, which would otherwise be lost with the worker; enabled carries the
+    # parent's setting to workers that are spawned rather than forked
+    PROFILER.enabled = enabled
+    result = func(*args)
+    return result, PROFILER.collect()
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', action='store_true', help='Print the time, files and bytes of each stage and the peak memory to stderr')
+    parser.add_argument('--profile-json', metavar='FILE', help='Write the stage profile as JSON to FILE')
+    parser.add_argument('--cprofile', metavar='FILE', help='Write cProfile statistics of the whole run to FILE')
 
 def add_page_number(paragraph):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
     run = paragraph.add_run()
     fldChar = OxmlElement('w:fldChar')
     fldChar.set(qn('w:fldCharType'), 'begin')
@@ -25,22 +168,123 @@ def add_page_number(paragraph):
     run._element.append(instrText)
     run._element.append(fldChar2)
 
-def convert_table_to_docx(table_html, document):
-    soup = BeautifulSoup(table_html, 'html.parser')
-    table = soup.find('table')
+HTML_TAG_RE = re.compile(r'<[^>]*>')
+TEXT_ALIGN_RE = re.compile(r'text-align:\s*(left|center|right)')
+# Characters XML cannot contain, which python-docx would refuse as cell text
+XML_INVALID_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
 
-    if table:
-        rows = table.find_all('tr')
-        docx_table = document.add_table(rows=len(rows), cols=len(rows[0].find_all(['th', 'td'])))
-        docx_table.style = 'Table Grid'
+def parse_markdown(markdown_content):
+    # Runs the same steps as markdown.Markdown.convert() but stops at the element tree,
+    # instead of serializing it to HTML that would only have to be parsed again
+    import markdown
+    md = markdown.Markdown(extensions=['tables'])
+    lines = markdown_content.split('\n')
+    for preprocessor in md.preprocessors:
+        lines = preprocessor.run(lines)
+    root = md.parser.parseDocument(lines).getroot()
+    for treeprocessor in md.treeprocessors:
+        new_root = treeprocessor.run(root)
+        if new_root is not None:
+            root = new_root
+    return root, md.htmlStash
 
-        for i, row in enumerate(rows):
-            cells = row.find_all(['th', 'td'])
-            for j, cell in enumerate(cells):
-                docx_table.cell(i, j).text = cell.get_text(strip=True)
+def stashed_text(html_stash, match):
+    # Raw HTML and entities are kept aside by the parser; use their text content
+    raw = html_stash.rawHtmlBlocks[int(match.group(1))]
+    if not isinstance(raw, str):
+        return ''.join(raw.itertext())
+    return html.unescape(HTML_TAG_RE.sub('', raw))
+
+def element_text(element, html_stash, skip=()):
+    from markdown import util as markdown_util
+    parts = []
+
+    def collect(node):
+        if node.text:
+            # Markdown stores the text of code spans and blocks already escaped for HTML
+            parts.append(html.unescape(node.text) if node.tag == 'code' else node.text)
+        for child in node:
+            if child.tag not in skip:
+                collect(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    collect(element)
+    text = ''.join(parts).replace(markdown_util.AMP_SUBSTITUTE, '&')
+    return markdown_util.HTML_PLACEHOLDER_RE.sub(lambda match: stashed_text(html_stash, match), text)
+
+def cell_alignment(cell):
+    # The tables extension sets alignment as a style, or as an align attribute if configured to
+    match = TEXT_ALIGN_RE.search(cell.get('style', ''))
+    return match.group(1) if match else cell.get('align')
+
+def run_xml(text, bold):
+    # Tabs and line breaks become <w:tab/> and <w:br/>, as python-docx's text setters do
+    content = []
+    for piece in re.split(r'(\t|\n)', XML_INVALID_RE.sub('', text)):
+        if piece == '\t':
+            content.append('<w:tab/>')
+        elif piece == '\n':
+            content.append('<w:br/>')
+        elif piece:
+            content.append(f'<w:t xml:space="preserve">{html.escape(piece, quote=False)}</w:t>')
+    properties = '<w:rPr><w:b/></w:rPr>' if bold else ''
+    return f'<w:r>{properties}{"".join(content)}</w:r>'
+
+def table_rows_xml(rows, widths, html_stash):
+    # Builds every row of a table in one string, parsed once, instead of filling cells
+    # through python-docx, whose cell() resolves the whole grid again on every call
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+    parts = [f'<w:tbl {nsdecls("w")}>']
+    for row in rows:
+        header = all(cell.tag == 'th' for cell in row)
+        # Header rows are repeated at the top of every page the table spans
+        parts.append('<w:tr><w:trPr><w:tblHeader/></w:trPr>' if header else '<w:tr>')
+        # Ragged rows are padded with empty cells up to the widest row
+        for j, width in enumerate(widths):
+            parts.append(f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>')
+            cell = row[j] if j < len(row) else None
+            text = element_text(cell, html_stash).strip() if cell is not None else ''
+            if not text:
+                parts.append('<w:p/></w:tc>')
+                continue
+            alignment = cell_alignment(cell)
+            properties = f'<w:pPr><w:jc w:val="{alignment}"/></w:pPr>' if alignment else ''
+            parts.append(f'<w:p>{properties}{run_xml(text, cell.tag == "th")}</w:p></w:tc>')
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return parse_xml(''.join(parts))
+
+def convert_table_to_docx(table, document, html_stash):
+    from docx.oxml.ns import qn
+    rows = [[cell for cell in row if cell.tag in ('th', 'td')] for row in table.iter('tr')]
+    cols = max((len(row) for row in rows), default=0)
+
+    if cols:
+        docx_table = document.add_table(rows=0, cols=cols)
+        docx_table.style = 'Table Grid'
+        widths = [grid_col.get(qn('w:w')) for grid_col in docx_table._tbl.tblGrid.iterchildren(qn('w:gridCol'))]
+        docx_table._tbl.extend(list(table_rows_xml(rows, widths, html_stash)))
 
         document.add_paragraph()  # Add a blank line after the table
 
+def convert_list_to_docx(element, document, html_stash, depth=1):
+    list_style = 'List Number' if element.tag == 'ol' else 'List Bullet'
+    if depth > 1:
+        # The default template has list styles for three levels
+        list_style += f' {min(depth, 3)}'
+    for li in element:
+        if li.tag != 'li':
+            continue
+        paragraph = document.add_paragraph(element_text(li, html_stash, skip=('ul', 'ol')).strip(), style=list_style)
+        if element.tag == 'ol':
+            # Reset numbering for each new ordered list
+            paragraph._element.get_or_add_pPr().get_or_add_numPr().get_or_add_numId().val = 1
+        for child in li:
+            if child.tag in ('ul', 'ol'):
+                convert_list_to_docx(child, document, html_stash, depth + 1)
+
 def extract_title_from_markdown(markdown_content):
     for line in markdown_content.split('\n'):
         if line.strip().startswith('# '):
@@ -48,6 +292,9 @@ def extract_title_from_markdown(markdown_content):
     return "Untitled"  # Return "Untitled" if no Header 1 is found
 
 def add_section_break(document):
+    from docx.enum.section import WD_SECTION
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
     new_section = document.add_section(WD_SECTION.NEW_PAGE)
     sectPr = new_section._sectPr
     type_element = sectPr.xpath('./w:type')
@@ -59,9 +306,36 @@ def add_section_break(document):
         sectPr.append(new_type)
     return new_section
 
-def convert_markdown_to_docx(markdown_content, output_file, book_title, date_str):
-    html_content = markdown.markdown(markdown_content, extensions=['tables'])
-    document = Document()
+def convert_blocks(parent, document, html_stash, current_section=None):
+    # Returns the text of the last H1, which names the section in the footer
+    for element in parent:
+        if element.tag == 'hr':
+            add_section_break(document)
+        elif element.tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            level = int(element.tag[1])
+            text = element_text(element, html_stash)
+            if level == 1:
+                current_section = text
+            document.add_heading(text, level=level)
+        elif element.tag == 'table':
+            with PROFILER.stage('tables'):
+                convert_table_to_docx(element, document, html_stash)
+        elif element.tag == 'p':
+            # New paragraphs already have the Normal style; setting it again makes
+            # python-docx search every style in the document for each paragraph
+            document.add_paragraph(element_text(element, html_stash))
+        elif element.tag in ('ul', 'ol'):
+            convert_list_to_docx(element, document, html_stash)
+        elif element.tag in ('blockquote', 'div'):
+            # Containers: convert the blocks inside them
+            current_section = convert_blocks(element, document, html_stash, current_section)
+    return current_section
+
+def convert_markdown_to_docx(markdown_content, output_file, book_title, date_str, template=None):
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    # A copy of an already loaded template is cheaper than loading it again
+    document = copy.deepcopy(template) if template is not None else Document()
 
     # Add title page
     document.add_heading(book_title, 0)
@@ -72,33 +346,11 @@ def convert_markdown_to_docx(markdown_content, output_file, book_title, date_str
     content_section = add_section_break(document)
     content_section.start_page_number = 1  # Start page numbering from 1 for content
 
-    # Parse HTML content
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    # Process content
-    current_section = None
-
-    for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'table', 'hr', 'ul', 'ol']):
-        if element.name == 'hr':
-            add_section_break(document)
-        elif element.name.startswith('h'):
-            level = int(element.name[1])
-            if level == 1:
-                current_section = element.get_text()
-            document.add_heading(element.get_text(), level=level)
-        elif element.name == 'table':
-            convert_table_to_docx(str(element), document)
-        elif element.name == 'p':
-            paragraph = document.add_paragraph(element.get_text())
-            paragraph.style = document.styles['Normal']
-        elif element.name in ['ul', 'ol']:
-            # Start a new list
-            list_style = 'List Number' if element.name == 'ol' else 'List Bullet'
-            for li in element.find_all('li'):
-                paragraph = document.add_paragraph(li.get_text(), style=list_style)
-                if element.name == 'ol':
-                    # Reset numbering for each new ordered list
-                    paragraph._element.get_or_add_pPr().get_or_add_numPr().get_or_add_numId().val = 1
+    # Process content: each block element is visited exactly once
+    with PROFILER.stage('parse'):
+        root, html_stash = parse_markdown(markdown_content)
+    with PROFILER.stage('build'):
+        current_section = convert_blocks(root, document, html_stash)
 
     # Add headers and footers, excluding the title page
     for i, section in enumerate(document.sections):
@@ -134,42 +386,161 @@ def convert_markdown_to_docx(markdown_content, output_file, book_title, date_str
             footer_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
     # Save the document
-    document.save(output_file)
+    with PROFILER.stage('write'):
+        document.save(output_file)
+    PROFILER.count('write', nbytes=os.path.getsize(output_file))
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+
+# The template every document starts from, loaded once per process by load_template()
+worker_template = None
+
+def load_template(template_path):
+    global worker_template
+    from docx import Document
+    with PROFILER.stage('template'):
+        worker_template = Document(template_path)
+
+def load_worker_template(template_path, profile):
+    # Pool initializer; profile switches profiling on in workers that are spawned rather than forked
+    PROFILER.enabled = profile
+    load_template(template_path)
+
+def find_markdown_files(inputs):
+    # Each input is a file, a directory searched recursively, or a glob pattern
+    files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for root, dirs, names in os.walk(pattern):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(MARKDOWN_EXTENSIONS))
+        elif glob.has_magic(pattern):
+            files.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            files.append(pattern)
+    return list(dict.fromkeys(files))
+
+def batch_output_file(input_file, base_dir, output_dir):
+    stem = os.path.splitext(input_file)[0]
+    if output_dir is None:
+        return stem + '.docx'
+    # Keep the layout of the inputs below the output directory
+    return os.path.join(output_dir, os.path.relpath(os.path.abspath(stem), base_dir) + '.docx')
+
+def convert_file(input_file, output_file, title, date_str):
+    try:
+        with PROFILER.stage('read'), open(input_file, 'r', encoding='utf-8') as file:
+            markdown_content = file.read()
+        PROFILER.count('read', nbytes=len(markdown_content))
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        book_title = title or extract_title_from_markdown(markdown_content)
+        convert_markdown_to_docx(markdown_content, output_file, book_title, date_str, worker_template)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+def convert_batch(input_files, output_dir, title, date_str, template_path, jobs):
+    base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(input_file)) for input_file in input_files])
+    output_files = [batch_output_file(input_file, base_dir, output_dir) for input_file in input_files]
+    count = len(input_files)
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(jobs, initializer=load_worker_template, initargs=(template_path, PROFILER.enabled)) as executor:
+            # The workers return the stages they timed with each result; the wait for them is
+            # timed here and overlaps those stages
+            with PROFILER.stage('workers'):
+                errors = []
+                for error, stages in executor.map(profiled_call, [PROFILER.enabled] * count, [convert_file] * count,
+                                                  input_files, output_files, [title] * count, [date_str] * count):
+                    PROFILER.merge(stages)
+                    errors.append(error)
+                results = list(zip(input_files, output_files, errors))
+            PROFILER.count('workers', count)
+    else:
+        load_template(template_path)
+        results = [(input_file, output_file, convert_file(input_file, output_file, title, date_str))
+                   for input_file, output_file in zip(input_files, output_files)]
+
+    failed = 0
+    for input_file, output_file, error in results:
+        if error:
+            failed += 1
+            print(f"Error converting {input_file}: {error}")
+        else:
+            print(f"Converted {input_file} -> {output_file}")
+    print(f"Batch complete: {count - failed} of {count} files converted")
+    return failed == 0
 
 def main():
     parser = argparse.ArgumentParser(description="Convert Markdown to DOCX", formatter_class=argparse.RawTextHelpFormatter)
-    parser.add_argument('-i', '--input', help='Input Markdown file')
-    parser.add_argument('-o', '--output', help='Output DOCX file (default: output.docx)')
+    parser.add_argument('-i', '--input', nargs='+',
+                        help='Input Markdown file, or for batch conversion several files, directories or glob patterns')
+    parser.add_argument('-o', '--output', help='Output DOCX file (default: output.docx); in batch mode, the output directory\n(default: next to each input)')
     parser.add_argument('-t', '--title', help='Book title (default: extracted from first H1 in Markdown)')
     parser.add_argument('-d', '--date', help='Date to include in footer (format: YYYY-MM-DD, default: current date)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes for batch conversion (default: number of CPUs)')
+    parser.add_argument('--template', help='DOCX file whose styles and page setup every output starts from\n(default: the python-docx default template)')
 
     # Check if there's input on stdin or any arguments
     if sys.stdin.isatty() and len(sys.argv) == 1:
         print("Usage: python md_to_docx.py [OPTIONS]\n")
         print("Options:")
         print("  -h, --help            Show this help message and exit")
-        print("  -i, --input INPUT     Input Markdown file")
-        print("  -o, --output OUTPUT   Output DOCX file (default: output.docx)")
+        print("  -i, --input INPUT     Input Markdown file, or several files, directories or glob patterns")
+        print("  -o, --output OUTPUT   Output DOCX file (default: output.docx), or output directory in batch mode")
         print("  -t, --title TITLE     Book title (default: extracted from first H1 in Markdown)")
         print("  -d, --date DATE       Date to include in footer (format: YYYY-MM-DD, default: current date)")
+        print("  -j, --jobs JOBS       Worker processes for batch conversion (default: number of CPUs)")
+        print("  --template TEMPLATE   DOCX file every output starts from")
+        print("  --profile             Print the time, files and bytes of each stage to stderr")
+        print("  --profile-json FILE   Write the stage profile as JSON to FILE")
+        print("  --cprofile FILE       Write cProfile statistics of the whole run to FILE")
         print("\nExamples:")
         print("  python md_to_docx.py -i input.md -o output.docx")
         print("  python md_to_docx.py -i input.md -t 'My Book' -d 2024-08-28")
         print("  cat input.md | python md_to_docx.py -o output.docx")
+        print("  python md_to_docx.py -i docs/ -o build/docx -j 8")
         sys.exit(1)
 
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    PROFILER.configure(args.profile, args.profile_json, args.cprofile)
+
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
+    # Determine date
+    if args.date:
+        try:
+            date_obj = datetime.strptime(args.date, "%Y-%m-%D")
+            date_str = date_obj.strftime("%B %d, %Y")
+        except ValueError:
+            print("Invalid date format. Using current date.")
+            date_str = datetime.now().strftime("%B %d, %Y")
+    else:
+        date_str = datetime.now().strftime("%B %d, %Y")
+
+    # Several inputs, a directory or a glob pattern: convert them all, in parallel
+    if args.input and (len(args.input) > 1 or os.path.isdir(args.input[0]) or glob.has_magic(args.input[0])):
+        input_files = find_markdown_files(args.input)
+        if not input_files:
+            print("Error: No Markdown files found.")
+            sys.exit(1)
+        sys.exit(0 if convert_batch(input_files, args.output, args.title, date_str, args.template, args.jobs) else 1)
 
     # Read markdown content
     if args.input:
-        with open(args.input, 'r', encoding='utf-8') as file:
+        with PROFILER.stage('read'), open(args.input[0], 'r', encoding='utf-8') as file:
             markdown_content = file.read()
     elif not sys.stdin.isatty():
-        markdown_content = sys.stdin.read()
+        with PROFILER.stage('read'):
+            markdown_content = sys.stdin.read()
     else:
         print("Error: No input provided. Please specify an input file or pipe content to stdin.")
         parser.print_help()
         sys.exit(1)
+    PROFILER.count('read', nbytes=len(markdown_content))
 
     # Determine book title
     if args.title:
@@ -183,23 +554,11 @@ def main():
     else:
         output_file = 'output.docx'
 
-    # Determine date
-    if args.date:
-        try:
-            date_obj = datetime.strptime(args.date, "%Y-%m-%D")
-            date_str = date_obj.strftime("%B %d, %Y")
-        except ValueError:
-            print("Invalid date format. Using current date.")
-            date_str = datetime.now().strftime("%B %d, %Y")
-    else:
-        date_str = datetime.now().strftime("%B %d, %Y")
-
     # Convert markdown to docx
-    convert_markdown_to_docx(markdown_content, output_file, book_title, date_str)
+    if args.template:
+        load_template(args.template)
+    convert_markdown_to_docx(markdown_content, output_file, book_title, date_str, worker_template)
     print(f"Conversion complete. Output saved to {output_file}")
 
 if __name__ == "__main__":
     main()
-
-if __name__ == "__main__":
-    main()
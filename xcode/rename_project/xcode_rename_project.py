@@ -6,101 +6,557 @@
 # See the LICENSE file for details.
  
 import os
+import re
 import sys
+import json
+import mmap
+import time
+import atexit
+import shutil
 import argparse
+import tempfile
+import threading
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Leading bytes inspected to tell text from binary files
+TEXT_SNIFF_BYTES = 8192
+# Files handed to a worker at a time with --jobs
+FILES_PER_TASK = 64
+# Directories that are never worth searching or renaming in; --exclude adds more
+DEFAULT_EXCLUDES = ['.git', 'DerivedData', 'Pods', 'build']
+# Journal of the last rename, kept in the project directory for --undo
+JOURNAL_DIR_NAME = '.xcode_rename_journal'
+JOURNAL_FILE_NAME = 'journal.json'
+
+# Stage profiling for --profile, --profile-json and --cprofile, or the TOOL_PROFILE and
+# TOOL_CPROFILE environment variables. The tools of this repository are installed as single
+# files, so each one carries this same Profiler; keep the copies identical.
+NULL_STAGE = nullcontext()
+
+class Profiler:
+    # Times named stages and counts the files and bytes that go through them; reports them
+    # with the peak memory at exit. Disabled, stage(), add() and timed() return at once.
+
+    def __init__(self):
+        self.enabled = False
+        self.summary = False
+        self.json_path = None
+        self.cprofile = None
+        self.cprofile_path = None
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker starts with no stages of its own, see profiled_call()
+            os.register_at_fork(after_in_child=self.collect)
+
+    def configure(self, summary=False, json_path=None, cprofile_path=None):
+        # TOOL_PROFILE=1 prints the summary, any other value is the path of the JSON report
+        environment = os.environ.get('TOOL_PROFILE', '')
+        if environment == '1':
+            summary = True
+        elif environment and not json_path:
+            json_path = environment
+        self.summary = summary
+        self.json_path = json_path
+        self.cprofile_path = cprofile_path or os.environ.get('TOOL_CPROFILE') or None
+        self.enabled = summary or json_path is not None
+        if self.cprofile_path:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if self.enabled or self.cprofile:
+            atexit.register(self.report)
+        self.start = time.perf_counter()
+
+    def stage(self, name):
+        return self._stage(name) if self.enabled else NULL_STAGE
+
+    @contextmanager
+    def _stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds=0.0, files=0, nbytes=0, calls=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'files': 0, 'bytes': 0})
+            stage['seconds'] += seconds
+            stage['calls'] += calls
+            stage['files'] += files
+            stage['bytes'] += nbytes
+
+    def count(self, name, files=1, nbytes=0):
+        self.add(name, files=files, nbytes=nbytes, calls=0)
+
+    def collect(self):
+        # Returns the stages recorded so far and starts over
+        with self.lock:
+            stages, self.stages = self.stages, {}
+        return stages
+
+    def merge(self, stages):
+        for name, stage in stages.items():
+            self.add(name, stage['seconds'], stage['files'], stage['bytes'], stage['calls'])
+
+    def timed(self, name, iterable):
+        # Times the production of every item of a lazy iterable, such as a directory walk
+        return self._timed(name, iterable) if self.enabled else iterable
+
+    def _timed(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start, calls=0)
+                return
+            self.add(name, time.perf_counter() - start, files=1)
+            yield item
+
+    def report(self):
+        total = time.perf_counter() - self.start
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_path)
+            sys.stderr.write(f"cProfile statistics written to {self.cprofile_path}\n")
+        if not self.enabled:
+            return
+        try:
+            import resource
+            peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            peak_rss_kb = peak // 1024 if sys.platform == 'darwin' else peak
+        except ImportError:
+            peak_rss_kb = None
+        if self.summary:
+            sys.stderr.write(f"{'stage':<22}{'ms':>10}{'calls':>9}{'files':>9}{'MB':>10}{'MB/s':>9}\n")
+            for name, stage in self.stages.items():
+                megabytes = stage['bytes'] / (1024 * 1024)
+                rate = f"{megabytes / stage['seconds']:.1f}" if stage['bytes'] and stage['seconds'] else '-'
+                sys.stderr.write(f"{name:<22}{stage['seconds'] * 1000:>10.1f}{stage['calls']:>9}{stage['files']:>9}"
+                                 f"{megabytes:>10.2f}{rate:>9}\n")
+            sys.stderr.write(f"{'total':<22}{total * 1000:>10.1f}\n")
+            if peak_rss_kb is not None:
+                sys.stderr.write(f"{'peak RSS':<22}{peak_rss_kb / 1024:>10.1f} MB\n")
+        if self.json_path:
+            with open(self.json_path, 'w') as f:
+                json.dump({'tool': os.path.basename(sys.argv[0]), 'argv': sys.argv[1:], 'total_seconds': round(total, 6),
+                           'peak_rss_kb': peak_rss_kb, 'stages': self.stages}, f, indent=2)
+                f.write('\n')
+
+PROFILER = Profiler()
+
+def profiled_call(enabled, func, *args):
+    # Runs func on a worker process and returns (result, stages) so the parent can merge() the
+    # stages timed there, which would otherwise be lost with the worker; enabled carries the
+    # parent's setting to workers that are spawned rather than forked
+    PROFILER.enabled = enabled
+    result = func(*args)
+    return result, PROFILER.collect()
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', action='store_true', help='Print the time, files and bytes of each stage and the peak memory to stderr')
+    parser.add_argument('--profile-json', metavar='FILE', help='Write the stage profile as JSON to FILE')
+    parser.add_argument('--cprofile', metavar='FILE', help='Write cProfile statistics of the whole run to FILE')
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
-def is_text_file(file_path):
-    try:
-        with open(file_path, 'rb') as f:
-            chunk = f.read(8192)
-            return b'\0' not in chunk and not chunk.startswith(b'%PDF-')
-    except Exception as e:
-        return False
+def name_replacements(old_name, new_name):
+    # The name as given and with spaces turned into underscores, longest first so one
+    # alternation matches either form; a name without spaces keeps its plain replacement
+    replacements = {old_name.replace(' ', '_'): new_name.replace(' ', '_'), old_name: new_name}
+    return dict(sorted(replacements.items(), key=lambda item: len(item[0]), reverse=True))
+
+def compile_name_pattern(replacements):
+    separator = b'|' if isinstance(next(iter(replacements)), bytes) else '|'
+    return re.compile(separator.join(map(re.escape, replacements)))
+
+def replace_names(name_pattern, replacements, text):
+    # One regex pass replaces and counts every form of the name, so text produced by one
+    # replacement is never matched again
+    return name_pattern.subn(lambda match: replacements[match.group()], text)
+
+def is_text_chunk(chunk):
+    return b'\0' not in chunk and not chunk.startswith(b'%PDF-')
 
-def is_git_repository(path):
-    return subprocess.call(['git', '-C', path, 'status'], stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL) == 0
+def find_git_root(path):
+    # A .git directory, or a .git file for worktrees and submodules, in path or one of its
+    # parents marks the repository; nothing in the working tree is scanned
+    path = Path(os.path.abspath(path))
+    for directory in [path, *path.parents]:
+        if (directory / '.git').exists():
+            return directory
+    return None
 
-def rename_item(old_path, new_path, use_git):
-    if use_git:
-        subprocess.run(['git', 'mv', old_path, new_path], check=True)
-    else:
-        os.rename(old_path, new_path)
+def read_git_index(project_dir):
+    # Index entries under project_dir as (mode, object, stage) and path relative to the repository root
+    output = subprocess.run(['git', '-C', str(project_dir), 'ls-files', '-s', '-z', '--full-name', '--', '.'],
+                            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout
+    entries = []
+    for record in filter(None, output.split(b'\0')):
+        info, path = record.split(b'\t', 1)
+        entries.append((info.decode('ascii').split(), os.fsdecode(path)))
+    return entries
 
-def process_file(file_path, old_name, new_name, old_name_underscored, dry_run):
+def plan_index_moves(git_root, index_entries, renamed):
+    # renamed maps the absolute original path of every renamed file and directory to its new
+    # name; returns [mode, object, stage, old path, new path] for each index entry below one
+    moves = []
+    for (mode, obj, stage), path in index_entries:
+        old_path = git_root
+        new_path = git_root
+        for part in Path(path).parts:
+            old_path = old_path / part
+            new_path = new_path / renamed.get(old_path, part)
+        if new_path != old_path:
+            moves.append([mode, obj, stage, path, new_path.relative_to(git_root).as_posix()])
+    return moves
+
+def apply_index_moves(git_root, moves, reverse=False):
+    # All entries are moved in one update-index call, which is what one git mv per item would
+    # have done, without a process and an index lock per rename
+    lines = []
+    for mode, obj, stage, old_path, new_path in moves:
+        if reverse:
+            old_path, new_path = new_path, old_path
+        lines.append(f"0 {obj} {stage}\t{old_path}")
+        lines.append(f"{mode} {obj} {stage}\t{new_path}")
+    if lines:
+        subprocess.run(['git', '-C', str(git_root), 'update-index', '-z', '--index-info'],
+                       input=b''.join(os.fsencode(line) + b'\0' for line in lines), check=True)
+
+def write_atomically(file_path, content):
+    # Write next to the file and rename over it, so an interrupted run leaves either the old
+    # or the new content; symlinks are followed so the link itself stays in place
+    target = os.path.realpath(file_path)
+    directory, name = os.path.split(target)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(target):
+            shutil.copymode(target, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def process_file(file_path, name_pattern, replacements, dry_run):
+    # Works on bytes so files are never decoded, and only files that mention the name are
+    # read in full: larger ones are searched through mmap without copying them
     messages = []
+    occurrences = 0
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+        with open(file_path, 'rb') as f:
+            content = f.read(TEXT_SNIFF_BYTES)
+            if not is_text_chunk(content):
+                return ["Skipping binary file"], 0
+            messages.append("Processing as text file")
+            if len(content) < TEXT_SNIFF_BYTES:
+                found = name_pattern.search(content) is not None
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    found = name_pattern.search(mapped) is not None
+                    if found:
+                        content = mapped[:]
 
-        new_content = content.replace(old_name, new_name).replace(old_name_underscored, new_name.replace(' ', '_'))
-        occurrences = content.count(old_name) + content.count(old_name_underscored)
+        new_content, occurrences = replace_names(name_pattern, replacements, content) if found else (content, 0)
 
         if occurrences > 0:
+            if not dry_run:
+                write_atomically(file_path, new_content)
             action = "Would replace" if dry_run else "Replaced"
             messages.append(f"{action} {occurrences} occurrences")
-            if not dry_run:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
         else:
             messages.append("No changes needed in file content")
     except Exception as e:
+        # A file that cannot be rewritten fails the run so it is rolled back; while planning,
+        # it is only reported
+        if not dry_run:
+            raise RuntimeError(f"cannot rewrite {file_path}: {e}") from e
         messages.append(f"Error processing file: {e}")
 
+    return messages, occurrences
+
+def process_files(file_paths, name_pattern, replacements, dry_run, jobs):
+    # (messages, occurrences) come back in file order whatever the number of workers
+    if jobs <= 1:
+        return [process_file(file_path, name_pattern, replacements, dry_run) for file_path in file_paths]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        count = len(file_paths)
+        return list(executor.map(process_file, file_paths, [name_pattern] * count, [replacements] * count,
+                                 [dry_run] * count, chunksize=FILES_PER_TASK))
+
+def plan_tree(project_dir, item_name_pattern, replacements, excludes):
+    # One top-down walk that skips excluded directories and collects the files to search and
+    # the files and directories to rename, ordered deepest first so children move before parents
+    file_paths = []
+    renames = []
+    excluded = []
+    for root, dirs, files in os.walk(project_dir):
+        root = Path(root)
+        kept = []
+        for directory in dirs:
+            if directory in excludes:
+                excluded.append(root / directory)
+            else:
+                kept.append(directory)
+        dirs[:] = kept
+
+        file_paths.extend(root / file for file in files)
+        for item in kept + files:
+            new_item, _ = replace_names(item_name_pattern, replacements, item)
+            if item != new_item:
+                renames.append((root / item, new_item))
+    renames.sort(key=lambda rename: len(rename[0].parts), reverse=True)
+    return file_paths, renames, excluded
+
+def find_rename_conflicts(renames):
+    # Destinations that would be overwritten, replaying the renames in order: a path is free
+    # only if nothing is there or an earlier rename has already moved it away. A destination
+    # that is the source itself, as in a case-only rename on a case-insensitive file system,
+    # is not a conflict
+    moved_away = set()
+    created = set()
+    conflicts = []
+    for old_path, new_item in renames:
+        new_path = old_path.parent / new_item
+        if new_path in created:
+            conflicts.append(new_path)
+        elif os.path.lexists(new_path) and new_path not in moved_away:
+            if not os.path.samestat(os.lstat(new_path), os.lstat(old_path)):
+                conflicts.append(new_path)
+        moved_away.add(old_path)
+        created.add(new_path)
+    return conflicts
+
+def save_journal(journal_dir, journal):
+    write_atomically(journal_dir / JOURNAL_FILE_NAME, json.dumps(journal, indent=2).encode('utf-8'))
+
+def load_journal(journal_dir):
+    # None when a run stopped before its journal was first saved
+    try:
+        with open(journal_dir / JOURNAL_FILE_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def undo_journal(project_dir, journal_dir):
+    # Steps that never ran are detected and skipped, so this also rolls back a run that
+    # stopped halfway
+    journal = load_journal(journal_dir)
+    if journal is None or journal['state'] == 'backup':
+        # The project itself is only changed once every backup is in place
+        if not journal_dir.is_dir():
+            return []
+        shutil.rmtree(journal_dir)
+        return ["Removed an unfinished rename journal; nothing had been changed"]
+    messages = []
+    if journal.get('index_moves'):
+        apply_index_moves(journal['git_root'], journal['index_moves'], reverse=True)
+        messages.append(f"Restored {len(journal['index_moves'])} git index entries")
+
+    for rename in reversed(journal['renames']):
+        old_path = project_dir / rename['path']
+        new_path = old_path.parent / rename['new_name']
+        if os.path.lexists(new_path) and not os.path.lexists(old_path):
+            os.rename(new_path, old_path)
+            messages.append(f"Renamed {new_path} back to {old_path.name}")
+
+    for rewrite in journal['rewrites']:
+        with open(journal_dir / rewrite['backup'], 'rb') as f:
+            write_atomically(project_dir / rewrite['path'], f.read())
+        messages.append(f"Restored contents of {project_dir / rewrite['path']}")
+
+    shutil.rmtree(journal_dir)
     return messages
 
-def rename_xcode_project(project_dir, old_name, new_name, dry_run, verbose):
+def undo_rename(project_dir):
     project_dir = Path(project_dir)
-    old_name_underscored = old_name.replace(' ', '_')
-    use_git = is_git_repository(project_dir)
+    journal_dir = project_dir / JOURNAL_DIR_NAME
+    if not journal_dir.is_dir():
+        eprint(f"No rename journal in {project_dir}, nothing to undo")
+        return False
+    for message in undo_journal(project_dir, journal_dir):
+        eprint(message)
+    return True
+
+def rename_xcode_project(project_dir, old_name, new_name, dry_run, verbose, jobs=1, excludes=DEFAULT_EXCLUDES):
+    project_dir = Path(project_dir)
+    journal_dir = project_dir / JOURNAL_DIR_NAME
+    replacements = name_replacements(old_name, new_name)
+    content_replacements = {old.encode('utf-8'): new.encode('utf-8') for old, new in replacements.items()}
+    content_pattern = compile_name_pattern(content_replacements)
+    item_name_pattern = compile_name_pattern(replacements)
     file_messages = defaultdict(list)
 
-    # First, process all file contents
-    for root, _, files in os.walk(project_dir):
-        for file in files:
-            full_path = Path(root) / file
-            if is_text_file(full_path):
-                file_messages[full_path].append("Processing as text file")
-                file_messages[full_path].extend(
-                    process_file(full_path, old_name, new_name, old_name_underscored, dry_run)
-                )
-            else:
-                file_messages[full_path].append("Skipping binary file")
+    journal = None if dry_run else load_journal(journal_dir)
+    if journal is not None and journal.get('state') not in ('backup', 'complete'):
+        eprint(f"An unfinished rename journal exists in {journal_dir}; run with --undo first")
+        return False
 
-    # Then, rename files and directories
-    for root, dirs, files in os.walk(project_dir, topdown=False):
-        for item in dirs + files:
-            old_path = Path(root) / item
-            new_item = item.replace(old_name, new_name).replace(old_name_underscored, new_name.replace(' ', '_'))
-            new_path = Path(root) / new_item
+    # Plan everything from a single walk before changing anything
+    with PROFILER.stage('walk'):
+        file_paths, renames, excluded = plan_tree(project_dir, item_name_pattern, replacements,
+                                                  set(excludes) | {JOURNAL_DIR_NAME})
+    PROFILER.count('walk', len(file_paths))
+    conflicts = find_rename_conflicts(renames)
+    if conflicts:
+        eprint("Renaming would overwrite existing files or directories; nothing was changed:")
+        for path in conflicts:
+            eprint(f"  {path}")
+        return False
+    with PROFILER.stage('scan'):
+        results = process_files(file_paths, content_pattern, content_replacements, True, jobs)
+    PROFILER.count('scan', len(file_paths))
+    rewrites = []
+    for file_path, (messages, occurrences) in zip(file_paths, results):
+        file_messages[file_path].extend(messages)
+        if occurrences > 0:
+            rewrites.append((file_path, occurrences))
+    for directory in excluded:
+        file_messages[directory].append("Skipping excluded directory")
+    action = "Would rename to" if dry_run else "Renamed to"
+    for old_path, new_item in renames:
+        file_messages[old_path].append(f"{action} {new_item}")
 
-            if item != new_item:
-                action = "Would rename to" if dry_run else "Renamed to"
-                file_messages[old_path].append(f"{action} {new_item}")
-                if not dry_run:
-                    rename_item(old_path, new_path, use_git)
+    if dry_run:
+        print(json.dumps({
+            'project_dir': str(project_dir),
+            'old_name': old_name,
+            'new_name': new_name,
+            'excluded': [str(directory.relative_to(project_dir)) for directory in excluded],
+            'rewrites': [{'path': str(file_path.relative_to(project_dir)), 'occurrences': occurrences}
+                         for file_path, occurrences in rewrites],
+            'renames': [{'path': str(old_path.relative_to(project_dir)), 'new_name': new_item}
+                        for old_path, new_item in renames],
+            'git': find_git_root(project_dir) is not None,
+        }, indent=2))
+    elif rewrites or renames:
+        # A run with nothing to do keeps the journal of the previous one for --undo
+        if journal_dir.is_dir():
+            shutil.rmtree(journal_dir)
+        try:
+            run_plan(project_dir, journal_dir, old_name, new_name, rewrites, renames, content_pattern,
+                     content_replacements, jobs, file_messages)
+        except BaseException as e:
+            eprint(f"Rename failed ({str(e) or type(e).__name__}), rolling back")
+            for message in undo_journal(project_dir, journal_dir):
+                eprint(f"  {message}")
+            return False
 
     for file_path, messages in file_messages.items():
         eprint(f"{file_path}:")
         for msg in messages:
             eprint(f"  {msg}")
         eprint()  # Add a blank line between files
+    return True
+
+def run_plan(project_dir, journal_dir, old_name, new_name, rewrites, renames, content_pattern, content_replacements,
+             jobs, file_messages):
+    # Every change is recorded in the journal, with a backup of each rewritten file, before
+    # it is made, so undo_journal can always put the project back
+    git_root = find_git_root(project_dir)
+    index_entries = []
+    if git_root is not None:
+        try:
+            index_entries = read_git_index(project_dir)
+        except (OSError, subprocess.CalledProcessError) as e:
+            eprint(f"Warning: cannot read the git index, renaming without git: {e}")
+            git_root = None
+
+    (journal_dir / 'backups').mkdir(parents=True)
+    # Keep the journal out of git status and commits
+    (journal_dir / '.gitignore').write_text('*\n')
+    journal = {
+        'old_name': old_name,
+        'new_name': new_name,
+        'state': 'backup',
+        'git_root': str(git_root) if git_root is not None else None,
+        'rewrites': [],
+        'renames': [{'path': str(old_path.relative_to(project_dir)), 'new_name': new_item} for old_path, new_item in renames],
+        'index_moves': [],
+    }
+    save_journal(journal_dir, journal)
+    with PROFILER.stage('backup'):
+        for number, (file_path, _) in enumerate(rewrites):
+            backup = f"backups/{number}"
+            shutil.copyfile(file_path, journal_dir / backup)
+            journal['rewrites'].append({'path': str(file_path.relative_to(project_dir)), 'backup': backup})
+            PROFILER.count('backup', nbytes=os.path.getsize(file_path))
+        journal['state'] = 'rewriting'
+        save_journal(journal_dir, journal)
+
+    rewrite_paths = [file_path for file_path, _ in rewrites]
+    with PROFILER.stage('rewrite'):
+        results = process_files(rewrite_paths, content_pattern, content_replacements, False, jobs)
+    PROFILER.count('rewrite', len(rewrite_paths))
+    for file_path, (messages, _) in zip(rewrite_paths, results):
+        file_messages[file_path] = messages
+
+    journal['state'] = 'renaming'
+    save_journal(journal_dir, journal)
+    renamed = {}
+    with PROFILER.stage('rename'):
+        for old_path, new_item in renames:
+            os.rename(old_path, old_path.parent / new_item)
+            renamed[Path(os.path.abspath(old_path))] = new_item
+    PROFILER.count('rename', len(renames))
+
+    if git_root is not None and renamed:
+        journal['state'] = 'indexing'
+        journal['index_moves'] = plan_index_moves(git_root, index_entries, renamed)
+        save_journal(journal_dir, journal)
+        with PROFILER.stage('index'):
+            apply_index_moves(git_root, journal['index_moves'])
+        PROFILER.count('index', len(journal['index_moves']))
+
+    journal['state'] = 'complete'
+    save_journal(journal_dir, journal)
 
 def main():
     parser = argparse.ArgumentParser(description="Rename an Xcode project.")
     parser.add_argument("project_dir", help="The directory of the Xcode project")
-    parser.add_argument("old_name", help="The current name of the project")
-    parser.add_argument("new_name", help="The new name for the project")
-    parser.add_argument("--dry-run", action="store_true", help="Print what would happen without making changes")
+    parser.add_argument("old_name", nargs="?", help="The current name of the project")
+    parser.add_argument("new_name", nargs="?", help="The new name for the project")
+    parser.add_argument("--dry-run", action="store_true", help="Print what would happen without making changes, and the plan as JSON on stdout")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes rewriting file contents (default: 1)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="NAME",
+                        help="Directory name to skip, in addition to the defaults; can be repeated")
+    parser.add_argument("--no-default-excludes", action="store_true",
+                        help=f"Do not skip the default directories ({', '.join(DEFAULT_EXCLUDES)})")
+    parser.add_argument("--undo", action="store_true", help="Revert the last rename of the project directory using its journal")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    PROFILER.configure(args.profile, args.profile_json, args.cprofile)
+
+    if args.undo:
+        with PROFILER.stage('undo'):
+            undone = undo_rename(args.project_dir)
+        sys.exit(0 if undone else 1)
+    if args.old_name is None or args.new_name is None:
+        parser.error("old_name and new_name are required unless --undo is given")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
 
-    rename_xcode_project(args.project_dir, args.old_name, args.new_name, args.dry_run, args.verbose)
+    excludes = ([] if args.no_default_excludes else DEFAULT_EXCLUDES) + args.exclude
+    if not rename_xcode_project(args.project_dir, args.old_name, args.new_name, args.dry_run, args.verbose, args.jobs, excludes):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()